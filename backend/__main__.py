@@ -4,6 +4,10 @@ from pyrogram import idle
 from backend import __version__, db
 from backend.logger import LOGGER
 from backend.fastapi import server
+from backend.helper import imdb
+from backend.helper.enrichment import enricher
+from backend.helper.known_files import known_files
+from backend.helper.plays import plays
 from backend.helper.pyro import restart_notification
 from backend.pyrofork import StreamBot
 from backend.pyrofork.clients import initialize_clients
@@ -16,6 +20,12 @@ async def start_services():
         await asleep(1.2)
         
         await db.connect()
+        await known_files.load()
+        loop.create_task(db.run_similar_rebuilds())
+        loop.create_task(db.run_similar_updates())
+        loop.create_task(plays.run_flush())
+        await imdb.start()
+        await enricher.start()
         await asleep(1.2)
         
         await StreamBot.start()
@@ -40,6 +50,8 @@ async def stop_services():
     try:
         LOGGER.info("Stopping services...")
         await StreamBot.stop()
+        await plays.flush()
+        await imdb.close()
         await db.disconnect()
         LOGGER.info("Services stopped successfully.")
     except Exception:
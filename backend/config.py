@@ -22,3 +22,40 @@ class Telegram:
     USE_TMDB = getenv("USE_TMDB", "False").lower() == "true"
     OWNER_ID = int(getenv("OWNER_ID", "8001097291"))
     USE_DEFAULT_ID = getenv("USE_DEFAULT_ID", None)
+    SIMILAR_TOP_K = int(getenv("SIMILAR_TOP_K", "60"))
+    SIMILAR_REBUILD_INTERVAL = int(getenv("SIMILAR_REBUILD_INTERVAL", str(6 * 60 * 60)))
+    CACHE_BACKEND = getenv("CACHE_BACKEND", "memory").lower()
+    CACHE_MAX_BYTES = int(getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    CACHE_TTL = int(getenv("CACHE_TTL", "300"))
+    IN_MEMORY_CATALOG = getenv("IN_MEMORY_CATALOG", "False").lower() == "true"
+    CATALOG_REFRESH_INTERVAL = int(getenv("CATALOG_REFRESH_INTERVAL", "30"))
+    CATALOG_FULL_RELOAD_INTERVAL = int(getenv("CATALOG_FULL_RELOAD_INTERVAL", "3600"))
+    API_MAX_AGE = int(getenv("API_MAX_AGE", "15"))
+    API_SHARED_MAX_AGE = int(getenv("API_SHARED_MAX_AGE", "60"))
+    CHANGE_FEED_RETENTION = int(getenv("CHANGE_FEED_RETENTION", str(30 * 24 * 3600)))
+    CHANGE_FEED_LAG = int(getenv("CHANGE_FEED_LAG", "5"))
+    EVENTS_QUEUE_SIZE = int(getenv("EVENTS_QUEUE_SIZE", "32"))
+    EVENTS_MAX_SUBSCRIBERS = int(getenv("EVENTS_MAX_SUBSCRIBERS", "10000"))
+    EVENTS_HEARTBEAT = int(getenv("EVENTS_HEARTBEAT", "15"))
+    PLAYS_FLUSH_INTERVAL = int(getenv("PLAYS_FLUSH_INTERVAL", "60"))
+    PLAYS_HALF_LIFE = int(getenv("PLAYS_HALF_LIFE", "86400"))
+    METADATA_CACHE_TTL = int(getenv("METADATA_CACHE_TTL", str(7 * 24 * 3600)))
+    METADATA_NEGATIVE_TTL = int(getenv("METADATA_NEGATIVE_TTL", "3600"))
+    METADATA_CACHE_ENTRIES = int(getenv("METADATA_CACHE_ENTRIES", "4096"))
+    IMDB_TIMEOUT = float(getenv("IMDB_TIMEOUT", "10"))
+    IMDB_CONNECT_TIMEOUT = float(getenv("IMDB_CONNECT_TIMEOUT", "5"))
+    IMDB_MAX_CONNECTIONS = int(getenv("IMDB_MAX_CONNECTIONS", "20"))
+    IMDB_RETRIES = int(getenv("IMDB_RETRIES", "2"))
+    IMDB_RETRY_BACKOFF = float(getenv("IMDB_RETRY_BACKOFF", "0.5"))
+    IMDB_HTTP2 = getenv("IMDB_HTTP2", "False").lower() == "true"
+    IMDB_RATE_LIMIT = float(getenv("IMDB_RATE_LIMIT", "5"))
+    IMDB_RATE_BURST = int(getenv("IMDB_RATE_BURST", "10"))
+    TMDB_RATE_LIMIT = float(getenv("TMDB_RATE_LIMIT", "40"))
+    TMDB_RATE_BURST = int(getenv("TMDB_RATE_BURST", "40"))
+    METADATA_HEDGE_DELAY = float(getenv("METADATA_HEDGE_DELAY", "3"))
+    BREAKER_FAILURE_THRESHOLD = int(getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+    BREAKER_RESET_TIMEOUT = int(getenv("BREAKER_RESET_TIMEOUT", "60"))
+    ENRICH_WORKERS = int(getenv("ENRICH_WORKERS", "4"))
+    ENRICH_MAX_ATTEMPTS = int(getenv("ENRICH_MAX_ATTEMPTS", "6"))
+    ENRICH_RETRY_BACKOFF = int(getenv("ENRICH_RETRY_BACKOFF", "30"))
+    BACKFILL_CONCURRENCY = int(getenv("BACKFILL_CONCURRENCY", "8"))
@@ -1,14 +1,17 @@
+from datetime import datetime
 from time import time
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Union
 from backend.helper.encrypt import decode_string
 from fastapi import FastAPI, Query, Request, HTTPException
-from fastapi.responses import StreamingResponse, HTMLResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse, HTMLResponse, ORJSONResponse, Response
 import urllib.parse
 from fastapi.templating import Jinja2Templates
+from pydantic import BaseModel, Field
+import asyncio
 import mimetypes
 import secrets
 import math
+import orjson
 import os
 from pathlib import Path
 
@@ -17,18 +20,51 @@ from backend.config import Telegram
 from backend.pyrofork import StreamBot, work_loads, multi_clients
 from backend.helper.exceptions import InvalidHash
 from backend.helper.custom_dl import ByteStreamer
+from backend.helper.cache import create_cache, make_etag, version_etag
+from backend.helper.catalog import catalog
+from backend.helper.events import create_hub
+from backend.helper.typeahead import typeahead
+from backend.helper.plays import plays
+from backend.helper import imdb
+from backend.helper.known_files import known_files
+from backend.helper.metadata_cache import metadata_cache
+from backend.helper.ratelimit import imdb_limiter, tmdb_limiter
+from backend.helper.resilience import imdb_breaker, tmdb_breaker
+from backend.helper.database import decode_cursor
+from backend.fastapi.static import StaticBundle, http_date, not_modified
 from fastapi.middleware.cors import CORSMiddleware
 from backend.helper.pyro import get_readable_time
 from telegram.constants import ChatMemberStatus
 from backend import StartTime, __version__, db
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 class_cache = {}
+response_cache = create_cache(db)
+# The snapshot must see a write before the cache drops stale entries, or a
+# request in between could re-cache the old data.
+if Telegram.IN_MEMORY_CATALOG:
+    db.add_listener(catalog.on_catalog_change)
+db.add_listener(response_cache.on_catalog_change)
+db.add_listener(typeahead.on_catalog_change)
+db.add_listener(known_files.on_catalog_change)
+# Last, so a client reacting to a push already reads fresh data.
+event_hub = create_hub()
+db.add_listener(event_hub.on_catalog_change)
 
-# Setup static files serving
+# Setup static files serving; the build is small enough to keep in memory
 static_dir = Path("../static")
-if static_dir.exists():
-    app.mount("/assets", StaticFiles(directory=str(static_dir / "assets")), name="assets")
+frontend = StaticBundle(static_dir)
+# Listings and details may be served a little stale, also by shared caches.
+API_CACHE_CONTROL = (
+    f"public, max-age={Telegram.API_MAX_AGE}, s-maxage={Telegram.API_SHARED_MAX_AGE}, "
+    f"stale-while-revalidate={Telegram.API_SHARED_MAX_AGE}"
+)
+# Per-user queries: briefly in the browser only.
+PRIVATE_CACHE_CONTROL = f"private, max-age={Telegram.API_MAX_AGE}"
+# The change feed is a cursor: always revalidated, never served stale.
+REVALIDATE_CACHE_CONTROL = "no-cache"
+# POST bodies are not cache keys; nothing may store the response.
+NO_STORE = "no-store"
 
 templates = Jinja2Templates(directory="backend/fastapi/templates")
 
@@ -40,6 +76,74 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def on_remote_invalidation(tags: Set[str]) -> None:
+    """Another replica wrote to the catalog: drop our copies and move the validators on."""
+    db.touch()
+    response_cache.invalidate(tags)
+
+
+@app.on_event("startup")
+async def start_cache_bus():
+    frontend.load()
+    loop = asyncio.get_running_loop()
+    loop.create_task(response_cache.bus.listen(on_remote_invalidation))
+    if Telegram.IN_MEMORY_CATALOG:
+        await catalog.start()
+    # Always on: /api/suggest has no database path, and the index holds six
+    # small fields per title rather than the full summaries.
+    await typeahead.start()
+
+
+def dump_json(value: Any) -> bytes:
+    # Documents come straight from MongoDB and were validated at ingest, so
+    # they are serialized as-is; ObjectIds and other BSON types become strings.
+    return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+def cache_headers(etag: str, cache_control: str, last_modified: Optional[datetime] = None) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def json_response(request: Request, body: bytes, etag: Optional[str] = None,
+                  cache_control: str = API_CACHE_CONTROL, last_modified: Optional[datetime] = None) -> Response:
+    """JSON bytes with validators and cache headers; 304 when the client is current."""
+    etag = etag or make_etag(body)
+    headers = cache_headers(etag, cache_control, last_modified)
+    if not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def cached(request: Request, key: str, tags: Callable[[Any], Set[str]], producer: Callable[[], Awaitable[Any]]) -> Response:
+    """
+    Serve pre-serialized JSON from the response cache, filling it from the
+    producer on a miss. The validators come from the catalog's last write,
+    so a client that is current gets its 304 before anything is rendered.
+    """
+    entry = response_cache.get(key)
+    if entry is not None:
+        body, etag, last_modified = entry
+        return json_response(request, body, etag, last_modified=last_modified)
+
+    last_modified = db.last_modified
+    etag = version_etag(key, last_modified)
+    if not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=cache_headers(etag, API_CACHE_CONTROL, last_modified))
+    value = await producer()
+    body = dump_json(value)
+    # A write that landed while the producer ran may not be in this body.
+    if db.last_modified == last_modified:
+        response_cache.set(key, body, tags(value), etag=etag, last_modified=last_modified)
+    return json_response(request, body, etag, last_modified=last_modified)
+
+
+def frontend_response(request: Request) -> Union[Response, dict]:
+    return frontend.index_page(request) or {"message": "Frontend not built yet. Run npm run build first."}
+
+
 @app.get("/", response_model=Dict[str, Any])
 async def get_bot_workloads():
     """
@@ -57,17 +161,29 @@ async def get_bot_workloads():
                 )
             ),
             "version": __version__,
+            "response_cache": response_cache.stats(),
+            "event_stream": event_hub.stats(),
+            "plays": plays.stats(),
+            "imdb_api": imdb.stats(),
+            "metadata_cache": metadata_cache.stats(),
+            "known_files": known_files.stats(),
+            "rate_limits": {"imdb": imdb_limiter.stats(), "tmdb": tmdb_limiter.stats()},
+            "circuits": {"imdb": imdb_breaker.stats(), "tmdb": tmdb_breaker.stats()},
         }
     return response
 
 @app.get("/app")
-async def serve_frontend():
+async def serve_frontend(request: Request):
     """Serve the React frontend"""
-    index_file = static_dir / "index.html"
-    if index_file.exists():
-        return FileResponse(str(index_file))
-    else:
-        return {"message": "Frontend not built yet. Run npm run build first."}
+    return frontend_response(request)
+
+@app.get("/assets/{path:path}")
+async def serve_asset(request: Request, path: str):
+    """Hashed build output, cached by browsers and CDNs for a year"""
+    response = frontend.asset(request, path)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return response
 
 @app.get("/is_member")
 async def is_member(user_id: int, channel: int):
@@ -100,55 +216,92 @@ async def watch(
         }
     )
 
+async def list_media(media_type: str, sort_params: List[tuple], page: int, page_size: int) -> dict:
+    """Answer listings from the in-memory catalog when it can, else from MongoDB."""
+    result = catalog.listing(media_type, sort_params, page, page_size) if catalog.ready else None
+    if result is None:
+        if media_type == "movie":
+            return await db.sort_movies(sort_params, page, page_size)
+        return await db.sort_tv_shows(sort_params, page, page_size)
+    total_count, docs = result
+    return {"total_count": total_count, "movies" if media_type == "movie" else "tv_shows": docs}
+
+
 @app.get("/api/tvshows", response_model=dict)
 async def get_sorted_tv_shows(
+    request: Request,
     sort_by: List[str] = Query(default=["rating:desc"], description="List of fields to sort by. Format: field:direction"),
     page: int = Query(default=1, ge=1, description="Page number to return"),
     page_size: int = Query(default=10, ge=1, description="Number of TV shows per page")
 ):
     try:
         sort_params = [tuple(param.split(":")) for param in sort_by]
-        sorted_tv_shows = await db.sort_tv_shows(sort_params, page, page_size)
-        return sorted_tv_shows
+        key = response_cache.make_key("tvshows", [("sort_by", ",".join(sort_by)), ("page", page), ("page_size", page_size)])
+        return await cached(request, key, lambda _: {"list:tv"}, lambda: list_media("tv", sort_params, page, page_size))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/api/movies", response_model=dict)
 async def get_sorted_movies(
+    request: Request,
     sort_by: List[str] = Query(default=["rating:desc"], description="List of fields to sort by. Format: field:direction"),
     page: int = Query(default=1, ge=1, description="Page number to return"),
     page_size: int = Query(default=10, ge=1, description="Number of movies per page")
 ):
     try:
         sort_params = [tuple(param.split(":")) for param in sort_by]
-        sorted_movies = await db.sort_movies(sort_params, page, page_size)
-        return sorted_movies
+        key = response_cache.make_key("movies", [("sort_by", ",".join(sort_by)), ("page", page), ("page_size", page_size)])
+        return await cached(request, key, lambda _: {"list:movie"}, lambda: list_media("movie", sort_params, page, page_size))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/api/id/{tmdb_id}", response_model=dict)
 async def get_media_details(
+    request: Request,
     tmdb_id: int, 
     season_number: Optional[int] = Query(None), 
     episode_number: Optional[int] = Query(None)
 ) -> Union[dict, None]:
     """
     FastAPI endpoint to get details of a document, specific season, or episode
-    by TMDB ID, season number, and episode number.
+    by TMDB ID, season number, and episode number. This is the only endpoint
+    returning the full nested document; listings return summaries.
     """
-    details = await db.get_media_details(
-        tmdb_id=tmdb_id, 
-        season_number=season_number, 
-        episode_number=episode_number
-    )
+    async def fetch_details():
+        details = await db.get_media_details(
+            tmdb_id=tmdb_id, 
+            season_number=season_number, 
+            episode_number=episode_number
+        )
+        if not details:
+            raise HTTPException(status_code=404, detail="Requested details not found")
+        return details
 
-    if not details:
-        raise HTTPException(status_code=404, detail="Requested details not found")
-    
-    return details
+    key = response_cache.make_key("id", [("tmdb_id", tmdb_id), ("season_number", season_number), ("episode_number", episode_number)])
+    return await cached(request, key, lambda _: {f"id:{tmdb_id}"}, fetch_details)
+
+class DetailRequest(BaseModel):
+    tmdb_id: int
+    season_number: Optional[int] = None
+    episode_number: Optional[int] = None
+
+
+class BatchDetailsRequest(BaseModel):
+    items: List[DetailRequest] = Field(..., max_length=100, description="Titles to resolve, in display order")
+
+
+@app.post("/api/id/batch", response_model=dict)
+async def get_media_details_batch(request: Request, body: BatchDetailsRequest):
+    """
+    Resolve many /api/id lookups in one request, e.g. for a watchlist row.
+    Results are returned in request order, with null for titles not found.
+    """
+    results = await db.get_media_details_batch([item.dict() for item in body.items])
+    return json_response(request, dump_json({"results": results}), cache_control=NO_STORE)
 
 @app.get("/api/similar/")
 async def get_similar_media(
+    request: Request,
     tmdb_id: int,
     media_type: str = Query(..., regex="^(movie|tvshow)$"),
     page: int = Query(default=1, ge=1, description="Page number to return"),
@@ -156,12 +309,27 @@ async def get_similar_media(
 ):
     """
     FastAPI endpoint to get similar movies or TV shows based on the parent tmdb_id, sorted by the number of genre matches and rating.
+    Served from the precomputed similar index.
     """
-    similar_media = await db.find_similar_media(tmdb_id=tmdb_id, media_type=media_type, page=page, page_size=page_size)
-    return similar_media
+    catalog_type = "movie" if media_type == "movie" else "tv"
+
+    def tags(value: dict) -> Set[str]:
+        return {f"similar:{catalog_type}", f"{catalog_type}:{tmdb_id}"} | {
+            f"{catalog_type}:{doc['tmdb_id']}" for doc in value["similar_media"]}
+
+    key = response_cache.make_key("similar", [("tmdb_id", tmdb_id), ("media_type", catalog_type), ("page", page), ("page_size", page_size)])
+    async def fetch_similar():
+        result = catalog.similar(catalog_type, tmdb_id, page, page_size) if catalog.ready else None
+        if result is None:
+            return await db.find_similar_media(tmdb_id=tmdb_id, media_type=media_type, page=page, page_size=page_size)
+        total_count, docs = result
+        return {"total_count": total_count, "similar_media": docs}
+
+    return await cached(request, key, tags, fetch_similar)
 
 @app.get("/api/search/", response_model=dict)
 async def search_documents_endpoint(
+    request: Request,
     query: str = Query(..., description="Search query string"),
     page: int = Query(default=1, ge=1, description="Page number to return"),
     page_size: int = Query(default=10, ge=1, description="Number of documents per page")
@@ -172,16 +340,99 @@ async def search_documents_endpoint(
     """
     try:
         search_results = await db.search_documents(query=query, page=page, page_size=page_size)
-        return search_results
+        return json_response(request, dump_json(search_results), cache_control=PRIVATE_CACHE_CONTROL)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.get("/api/suggest", response_model=dict)
+async def suggest_titles(
+    request: Request,
+    q: str = Query(..., description="What the user has typed so far"),
+    limit: int = Query(default=8, ge=1, le=20, description="Number of suggestions to return")
+):
+    """
+    Autocomplete for the search box: best rated titles with a word starting
+    with the query, answered from the in-memory typeahead index.
+    """
+    return json_response(request, dump_json({"results": typeahead.suggest(q, limit)}),
+                         cache_control=PRIVATE_CACHE_CONTROL)
+
+@app.get("/api/filter", response_model=dict)
+async def filter_media_endpoint(
+    request: Request,
+    media_type: str = Query(..., regex="^(movie|tv)$"),
+    genre: List[str] = Query(default=[], description="Genres the title must all have"),
+    language: List[str] = Query(default=[], description="Languages, any of which must be available"),
+    quality: List[str] = Query(default=[], description="Qualities, any of which must be available"),
+    rip: List[str] = Query(default=[], description="Rips, any of which must match"),
+    year_from: Optional[int] = Query(None, description="Earliest release year"),
+    year_to: Optional[int] = Query(None, description="Latest release year"),
+    sort_by: List[str] = Query(default=["rating:desc"], description="List of fields to sort by. Format: field:direction"),
+    page: int = Query(default=1, ge=1, description="Page number to return"),
+    page_size: int = Query(default=10, ge=1, description="Number of titles per page")
+):
+    """
+    FastAPI endpoint to filter movies or TV shows by genre, language, quality,
+    rip and release year, with sorting, pagination and facet counts.
+    """
+    try:
+        sort_params = [tuple(param.split(":")) for param in sort_by]
+        key = response_cache.make_key("filter", [
+            ("media_type", media_type), ("genre", ",".join(sorted(genre))),
+            ("language", ",".join(sorted(language))), ("quality", ",".join(sorted(quality))),
+            ("rip", ",".join(sorted(rip))), ("year_from", year_from), ("year_to", year_to),
+            ("sort_by", ",".join(sort_by)), ("page", page), ("page_size", page_size)])
+        return await cached(request, key, lambda _: {f"list:{media_type}"}, lambda: db.filter_media(
+            media_type, sort_params, page, page_size, genres=genre, languages=language,
+            qualities=quality, rips=rip, year_from=year_from, year_to=year_to))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/changes", response_model=dict)
+async def get_catalog_changes(
+    request: Request,
+    since: Optional[str] = Query(None, description="Cursor returned by the previous call; omit to start from the beginning"),
+    limit: int = Query(default=500, ge=1, le=1000, description="Maximum number of changes to return")
+):
+    """
+    Change feed for keeping a local mirror of the catalog. Returns titles added,
+    updated (with their summary) or deleted after the cursor, oldest first.
+    Call again with the returned cursor while `has_more` is true; if `reset`
+    is true the cursor is too old and the mirror must be rebuilt from scratch.
+    """
+    try:
+        cursor = decode_cursor(since) if since else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response(request, dump_json(await db.changes_since(cursor, limit)),
+                         cache_control=REVALIDATE_CACHE_CONTROL)
+
+@app.get("/api/events")
+async def stream_catalog_events(request: Request):
+    """
+    Server-Sent Events stream announcing titles as they are added, updated or
+    deleted. A `resync` event means this client fell behind and missed some;
+    it should catch up through /api/changes.
+    """
+    if event_hub.full():
+        raise HTTPException(status_code=503, detail="Too many event stream clients")
+    subscription = event_hub.subscribe()
+    return StreamingResponse(
+        event_hub.stream(subscription, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get('/dl/{id}/{name}')
 async def stream_handler(request: Request, id: str, name: str):
     decoded_data = await decode_string(id)
     if not decoded_data['msg_id'] or not decoded_data['hash']:
         raise HTTPException(status_code=400, detail="Missing id or hash")
     chat_id = f"-100{decoded_data['chat_id']}"
+    # Players fetch many ranges per viewing; only the first one counts as a play.
+    range_header = request.headers.get("Range")
+    if not range_header or range_header.replace(" ", "").startswith("bytes=0-"):
+        plays.record(id)
     return await media_streamer(request, int(chat_id), int(decoded_data['msg_id']), decoded_data['hash'])
 
 async def media_streamer(request: Request, chat_id: int, id: int, secure_hash: str):
@@ -268,11 +519,7 @@ async def serve_react_app(request: Request, path: str):
     if path.startswith("api/") or path.startswith("dl/"):
         raise HTTPException(status_code=404, detail="Not found")
     
-    index_file = static_dir / "index.html"
-    if index_file.exists():
-        return FileResponse(str(index_file))
-    else:
-        return {"message": "Frontend not built yet. Run npm run build first."}
+    return frontend_response(request)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,149 @@
+import gzip
+import mimetypes
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from backend.helper.cache import make_etag
+from backend.logger import LOGGER
+
+
+# Vite puts a content hash in every file name under /assets.
+IMMUTABLE = "public, max-age=31536000, immutable"
+# index.html must be revalidated so new deployments are picked up at once.
+REVALIDATE = "no-cache"
+
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml", "application/xml")
+
+
+ENCODING_SUFFIXES = {"br": "-br", "gzip": "-gz"}
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """Accept-Encoding as {coding: q-value}, lower-cased; codings with q=0 are kept as refused."""
+    accepted = {}
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True when the client's If-None-Match already names this representation."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def http_date(moment: datetime) -> str:
+    """A naive UTC datetime as an HTTP date."""
+    return formatdate((moment - datetime(1970, 1, 1)).total_seconds(), usegmt=True)
+
+
+def not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    Whether the client's copy is current: If-None-Match when sent, otherwise
+    If-Modified-Since against `last_modified` (to the second).
+    """
+    if request.headers.get("if-none-match"):
+        return etag_matches(request, etag)
+    since = request.headers.get("if-modified-since")
+    if not since or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(since).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        return False
+    return last_modified.replace(microsecond=0) <= since
+
+
+class StaticFile:
+    """
+    One file held in memory together with its pre-compressed variants. Each
+    variant is its own representation and gets its own strong ETag.
+    """
+    __slots__ = ("body", "encoded", "media_type", "etag", "last_modified")
+
+    def __init__(self, path: Path):
+        self.body = path.read_bytes()
+        self.media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        self.etag = make_etag(self.body)
+        self.last_modified = formatdate(path.stat().st_mtime, usegmt=True)
+        self.encoded: Dict[str, bytes] = {}
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            sibling = path.with_name(path.name + suffix)
+            if sibling.exists():
+                self.encoded[encoding] = sibling.read_bytes()
+        if "gzip" not in self.encoded and self.media_type.startswith(COMPRESSIBLE):
+            compressed = gzip.compress(self.body, compresslevel=9, mtime=0)
+            if len(compressed) < len(self.body):
+                self.encoded["gzip"] = compressed
+
+    def _encoding(self, request: Request) -> Optional[str]:
+        """The stored encoding the client ranks highest (br on a tie), None for the plain body."""
+        accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+        best, best_q = None, 0.0
+        for encoding in ("br", "gzip"):
+            q = accepted.get(encoding, accepted.get("*", 0.0))
+            if encoding in self.encoded and q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def response(self, request: Request, cache_control: str) -> Response:
+        encoding = self._encoding(request)
+        etag = self.etag if encoding is None else self.etag[:-1] + ENCODING_SUFFIXES[encoding] + '"'
+        headers = {
+            "ETag": etag,
+            "Last-Modified": self.last_modified,
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        if encoding is None:
+            return Response(self.body, media_type=self.media_type, headers=headers)
+        headers["Content-Encoding"] = encoding
+        return Response(self.encoded[encoding], media_type=self.media_type, headers=headers)
+
+
+class StaticBundle:
+    """The built frontend, read once and served from memory."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.index: Optional[StaticFile] = None
+        self.assets: Dict[str, StaticFile] = {}
+
+    def load(self) -> None:
+        index_file = self.root / "index.html"
+        self.index = StaticFile(index_file) if index_file.exists() else None
+        assets_dir = self.root / "assets"
+        self.assets = {}
+        if assets_dir.is_dir():
+            for path in assets_dir.rglob("*"):
+                if path.is_file() and path.suffix not in (".br", ".gz"):
+                    self.assets[path.relative_to(assets_dir).as_posix()] = StaticFile(path)
+        LOGGER.info(f"Loaded frontend bundle: index={'yes' if self.index else 'no'}, {len(self.assets)} assets")
+
+    def asset(self, request: Request, path: str) -> Optional[Response]:
+        file = self.assets.get(path)
+        return file.response(request, IMMUTABLE) if file else None
+
+    def index_page(self, request: Request) -> Optional[Response]:
+        return self.index.response(request, REVALIDATE) if self.index else None
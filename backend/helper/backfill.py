@@ -0,0 +1,283 @@
+"""
+Re-ingest the history of the AUTH_CHANNEL channels, e.g. for a new
+deployment or after a schema change. Progress is checkpointed in the
+`backfill` collection, so an interrupted run resumes where it stopped.
+The same run is available to the owner as the /backfill bot command.
+
+Usage: python -m backend.helper.backfill [--channel ID ...] [--end ID] [--reset]
+"""
+import argparse
+import asyncio
+from asyncio import Lock, Queue, Semaphore, gather, sleep as asleep
+from datetime import datetime
+from time import monotonic
+from typing import Awaitable, Callable, List, Optional
+
+from pyrogram.errors import FloodWait
+
+from backend import db
+from backend.config import Telegram
+from backend.helper.enrichment import catalog_lock, enricher
+from backend.helper.known_files import known_files
+from backend.helper.metadata import metadata, parse_media, provisional_metadata
+from backend.helper.pyro import read_file
+from backend.logger import LOGGER
+
+
+# Bots cannot list a chat's history, but can fetch up to 200 posts by id.
+PAGE_SIZE = 200
+PAGES_PER_CLIENT = 2
+PAGE_RETRIES = 3
+# Without --end the newest post is not known up front: the scan ends after
+# this many ids past the newest post seen turn out empty.
+END_GAP = 10 * PAGE_SIZE
+REPORT_INTERVAL = 10
+
+Report = Callable[[str], Awaitable[None]]
+
+
+class Backfill:
+    """
+    Walks each channel in pages of PAGE_SIZE message ids. The pages are
+    spread over every bot client (PAGES_PER_CLIENT in flight each) and the
+    files on them go through parse -> resolve -> write, at most
+    BACKFILL_CONCURRENCY at a time. Files whose metadata cannot be resolved
+    are written under a placeholder and left to the enricher.
+
+    Pages finish out of order; the checkpoint only moves past a page once
+    it and every page before it are done. A page that cannot be fetched, or
+    holds a file that could not be written, stops the checkpoint; it is
+    listed under `failed` in the checkpoint and scanned again by the next
+    run, so a resumed run never skips a file.
+    Files already in the catalog are skipped unless the run is a reset, which
+    re-ingests everything; files written twice are merged by the usual upsert.
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self.running = False
+
+    @property
+    def _checkpoints(self):
+        return self.database.db["backfill"]
+
+    @staticmethod
+    def describe(state: dict) -> str:
+        elapsed = max(monotonic() - state["started"], 1e-6)
+        return (f"{state['channel']}: up to #{state['next_id'] - 1}, "
+                f"{state['scanned']} messages ({state['scanned'] / elapsed:.0f}/s), "
+                f"{state['files']} files ({state['files'] / elapsed:.1f}/s), {state['known']} already known, "
+                f"{state['placeholders']} placeholders, {state['errors']} errors, "
+                f"{state['failed_pages']} pages failed")
+
+    async def run(self, clients: List, channels: List[str], reset: bool = False,
+                  end_id: Optional[int] = None, report: Optional[Report] = None) -> List[dict]:
+        """Backfill `channels` one after the other; returns the final state of each."""
+        if self.running:
+            raise RuntimeError("A backfill is already running")
+        self.running = True
+        try:
+            return [await self._channel(clients, str(chat_id), reset, end_id, report) for chat_id in channels]
+        finally:
+            self.running = False
+
+    async def _ingest(self, entry: dict, state: dict, semaphore: Semaphore) -> bool:
+        """False when the file could not be written and its page must be scanned again."""
+        post = (entry["unique_id"], entry["channel"], entry["msg_id"])
+        # A reset run re-ingests everything; otherwise catalogued files are skipped.
+        # Only posts claimed here are released again, never one another ingest holds.
+        claimed = not state["reset"]
+        if claimed and not known_files.claim(*post):
+            state["known"] += 1
+            return True
+        async with semaphore:
+            parsed = parse_media(entry["filename"])
+            if parsed is None:
+                if claimed:
+                    known_files.release(*post)
+                return True
+            try:
+                info = await metadata(entry["filename"], None)
+                placeholder = info is None
+                if placeholder:
+                    info = provisional_metadata(parsed)
+                async with catalog_lock:
+                    doc_id = await self.database.insert_media(
+                        info, hash=entry["hash"], channel=entry["channel"], msg_id=entry["msg_id"],
+                        size=entry["size"], name=entry["name"])
+                if doc_id is None:
+                    state["errors"] += 1
+                    if claimed:
+                        known_files.release(*post)
+                    return False
+                await known_files.add(entry["channel"], entry["msg_id"], info["media_type"],
+                                      info["tmdb_id"], entry["unique_id"])
+                if placeholder:
+                    state["placeholders"] += 1
+                    await enricher.submit(entry["filename"], info, entry["hash"], entry["channel"],
+                                          entry["msg_id"], entry["size"], entry["name"])
+                state["files"] += 1
+                return True
+            except Exception as e:
+                state["errors"] += 1
+                if claimed:
+                    known_files.release(*post)
+                LOGGER.error(f"Backfill failed for {entry['filename']}: {e}")
+                return False
+
+    async def _page(self, client, chat_id: str, start: int, state: dict, semaphore: Semaphore) -> bool:
+        """Whether every post on the page was read and every file on it written."""
+        ids = list(range(start, start + PAGE_SIZE))
+        attempts = 0
+        while True:
+            try:
+                messages = await client.get_messages(int(chat_id), ids)
+                break
+            except FloodWait as e:
+                await asleep(e.value)
+            except Exception as e:
+                attempts += 1
+                if attempts >= PAGE_RETRIES:
+                    LOGGER.error(f"Backfill of {chat_id} gave up on #{start}-#{start + PAGE_SIZE - 1}: {e}")
+                    return False
+                await asleep(2 ** attempts)
+
+        entries = []
+        for message in messages:
+            # Deleted posts and ids past the newest post come back empty.
+            if message.empty:
+                continue
+            state["last_seen"] = max(state["last_seen"], message.id)
+            entry = read_file(message)
+            if entry is not None:
+                entries.append(entry)
+        state["scanned"] += len(ids)
+        return all(await gather(*(self._ingest(entry, state, semaphore) for entry in entries)))
+
+    async def _channel(self, clients: List, chat_id: str, reset: bool,
+                       end_id: Optional[int], report: Optional[Report]) -> dict:
+        checkpoint = None if reset else await self._checkpoints.find_one({"_id": chat_id})
+        first = checkpoint["next_id"] if checkpoint else 1
+        base_files = checkpoint.get("files", 0) if checkpoint else 0
+        state = {
+            "channel": chat_id, "next_id": first, "last_seen": first - 1, "scanned": 0,
+            "files": 0, "known": 0, "placeholders": 0, "errors": 0, "failed_pages": 0,
+            "reset": reset, "started": monotonic(),
+        }
+        LOGGER.info(f"Backfilling {chat_id} from #{first} with {len(clients)} clients")
+
+        pages: Queue = Queue(maxsize=len(clients) * PAGES_PER_CLIENT)
+        semaphore = Semaphore(Telegram.BACKFILL_CONCURRENCY)
+        finished: set = set()
+        failed: set = set()
+        save_lock = Lock()
+
+        async def save(**extra) -> None:
+            async with save_lock:
+                await self._checkpoints.update_one({"_id": chat_id}, {"$set": {
+                    "next_id": state["next_id"], "last_seen": state["last_seen"],
+                    "failed": [[start, start + PAGE_SIZE - 1] for start in sorted(failed)],
+                    "files": base_files + state["files"], "updated_on": datetime.utcnow(), **extra,
+                }}, upsert=True)
+
+        async def produce() -> None:
+            start = first
+            while not (end_id and start > end_id):
+                if not end_id and start > state["last_seen"] + END_GAP:
+                    # Pages still in flight may move last_seen; only stop once they are done.
+                    await pages.join()
+                    if start > state["last_seen"] + END_GAP:
+                        break
+                    continue
+                await pages.put(start)
+                start += PAGE_SIZE
+            for _ in range(workers):
+                await pages.put(None)
+
+        async def fetch(client) -> None:
+            while True:
+                start = await pages.get()
+                if start is None:
+                    pages.task_done()
+                    return
+                done = False
+                try:
+                    done = await self._page(client, chat_id, start, state, semaphore)
+                finally:
+                    if done:
+                        finished.add(start)
+                    else:
+                        # Never added to `finished`, so next_id stops here.
+                        failed.add(start)
+                        state["failed_pages"] += 1
+                    advanced = False
+                    while state["next_id"] in finished:
+                        finished.discard(state["next_id"])
+                        state["next_id"] += PAGE_SIZE
+                        advanced = True
+                    if advanced or not done:
+                        await save()
+                    pages.task_done()
+
+        async def progress() -> None:
+            while True:
+                await asleep(REPORT_INTERVAL)
+                try:
+                    await report(self.describe(state))
+                except Exception as e:
+                    LOGGER.debug(f"Backfill progress report failed: {e}")
+
+        workers = len(clients) * PAGES_PER_CLIENT
+        reporter = asyncio.ensure_future(progress()) if report else None
+        try:
+            await gather(produce(), *(fetch(client) for client in clients for _ in range(PAGES_PER_CLIENT)))
+        finally:
+            if reporter:
+                reporter.cancel()
+        # The trailing empty ids may be filled by posts made later; the next
+        # run starts right after the newest post seen.
+        state["next_id"] = min(state["next_id"], state["last_seen"] + 1)
+        await save(finished_on=datetime.utcnow())
+
+        summary = self.describe(state)
+        LOGGER.info(f"Backfill finished: {summary}")
+        if report:
+            await report(f"Finished {summary}")
+        return state
+
+
+backfill = Backfill(db)
+
+
+async def main(channels: List[str], end_id: Optional[int], reset: bool):
+    from backend.helper import imdb
+    from backend.pyrofork import StreamBot, multi_clients
+    from backend.pyrofork.clients import initialize_clients
+
+    async def log(text: str) -> None:
+        LOGGER.info(text)
+
+    await db.connect()
+    await imdb.start()
+    await StreamBot.start()
+    try:
+        await initialize_clients()
+        await enricher.start()
+        await backfill.run(list(multi_clients.values()), channels or Telegram.AUTH_CHANNEL,
+                           reset=reset, end_id=end_id, report=log)
+        await enricher.drain()
+    finally:
+        for client in multi_clients.values():
+            await client.stop()
+        await imdb.close()
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--channel", action="append", default=[],
+                        help="channel id to backfill (default: every AUTH_CHANNEL)")
+    parser.add_argument("--end", type=int, default=None, help="last message id to read")
+    parser.add_argument("--reset", action="store_true", help="ignore checkpoints and start from the first post")
+    args = parser.parse_args()
+    asyncio.run(main(args.channel, args.end, args.reset))
@@ -0,0 +1,188 @@
+from asyncio import sleep as asleep
+from collections import OrderedDict
+from datetime import datetime
+from hashlib import blake2b
+from time import monotonic
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+from uuid import uuid4
+
+from pymongo import CursorType
+
+from backend.config import Telegram
+from backend.logger import LOGGER
+
+
+def make_etag(body: bytes) -> str:
+    """Strong validator derived from the bytes, so every replica agrees on it."""
+    return '"' + blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def version_etag(key: str, version: datetime) -> str:
+    """
+    Validator for a cached response derived from its cache key and the
+    catalog's last write, so it is known before the response is rendered.
+    """
+    return make_etag(f"{key}|{version.isoformat()}".encode())
+
+
+class InvalidationBus:
+    """
+    Carries invalidations between API replicas. The default bus is local only;
+    replace it to share invalidations across processes.
+    """
+
+    async def publish(self, tags: Set[str]) -> None:
+        pass
+
+    async def listen(self, callback: Callable[[Set[str]], None]) -> None:
+        pass
+
+
+class MongoInvalidationBus(InvalidationBus):
+    """Shares invalidations through a capped collection tailed by every replica."""
+
+    def __init__(self, database, name: str = "cache_invalidations", size: int = 1024 * 1024):
+        self.database = database
+        self.name = name
+        self.size = size
+        self.origin = uuid4().hex
+
+    async def _collection(self):
+        db = self.database.db
+        if self.name not in await db.list_collection_names():
+            try:
+                await db.create_collection(self.name, capped=True, size=self.size)
+                # A tailable cursor on an empty capped collection dies immediately.
+                await db[self.name].insert_one({"origin": None, "tags": []})
+            except Exception:
+                pass  # Another replica created it first
+        return db[self.name]
+
+    async def publish(self, tags: Set[str]) -> None:
+        collection = await self._collection()
+        await collection.insert_one({"origin": self.origin, "tags": list(tags)})
+
+    async def listen(self, callback: Callable[[Set[str]], None]) -> None:
+        collection = await self._collection()
+        # Skip the backlog, only invalidations from now on matter.
+        last = None
+        async for doc in collection.find().sort("$natural", -1).limit(1):
+            last = doc["_id"]
+        while True:
+            try:
+                cursor = collection.find(
+                    {"_id": {"$gt": last}} if last else {}, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for doc in cursor:
+                        last = doc["_id"]
+                        if doc.get("origin") not in (None, self.origin):
+                            callback(set(doc["tags"]))
+                    await asleep(1)
+            except Exception as e:
+                LOGGER.error(f"Error tailing cache invalidations: {e}")
+            await asleep(5)
+
+
+class ResponseCache:
+    """
+    In-process LRU cache of serialized API responses with a memory budget and TTL.
+    Entries carry tags (e.g. "list:movie", "movie:123") and are dropped when
+    the catalog reports a write touching one of them.
+    """
+
+    def __init__(self, max_bytes: int, ttl: int, bus: Optional[InvalidationBus] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bus = bus or InvalidationBus()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+
+    @staticmethod
+    def make_key(path: str, params: Iterable[tuple]) -> str:
+        """Route plus query parameters in a canonical order."""
+        return path + "?" + "&".join(f"{k}={v}" for k, v in sorted(params))
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str, Optional[datetime]]]:
+        """The cached body, its ETag and last-modified time, or None."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < monotonic():
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2], entry[4], entry[5]
+
+    def set(self, key: str, value: bytes, tags: Set[str], etag: Optional[str] = None,
+            last_modified: Optional[datetime] = None) -> str:
+        """Store a body and return its ETag (derived from the body unless given)."""
+        etag = etag or make_etag(value)
+        size = len(value)
+        if size > self.max_bytes:
+            return etag
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (monotonic() + self.ttl, size, value, tags, etag, last_modified)
+        self.size += size
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while self.size > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+        return etag
+
+    def _drop(self, key: str) -> None:
+        _, size, _, tags, _, _ = self._entries.pop(key)
+        self.size -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate(self, tags: Set[str]) -> None:
+        for tag in tags:
+            for key in list(self._tags.get(tag, ())):
+                if key in self._entries:
+                    self._drop(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tags.clear()
+        self.size = 0
+
+    @staticmethod
+    def tags_for_change(event: dict) -> Set[str]:
+        media_type = event["media_type"]
+        tmdb_id = event["tmdb_id"]
+        tags = {f"id:{tmdb_id}", f"{media_type}:{tmdb_id}", f"list:{media_type}", "search"}
+        if event.get("similar_changed"):
+            tags.add(f"similar:{media_type}")
+        return tags
+
+    async def on_catalog_change(self, event: dict) -> None:
+        """Database listener: drop affected entries here and on other replicas."""
+        tags = self.tags_for_change(event)
+        self.invalidate(tags)
+        try:
+            await self.bus.publish(tags)
+        except Exception as e:
+            LOGGER.error(f"Error publishing cache invalidation: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def create_cache(database) -> ResponseCache:
+    bus = MongoInvalidationBus(database) if Telegram.CACHE_BACKEND == "mongo" else None
+    return ResponseCache(max_bytes=Telegram.CACHE_MAX_BYTES, ttl=Telegram.CACHE_TTL, bus=bus)
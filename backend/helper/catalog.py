@@ -0,0 +1,220 @@
+from asyncio import get_running_loop, sleep as asleep
+from bisect import bisect_left, insort
+from datetime import datetime
+from time import monotonic
+from typing import Dict, List, Optional, Set, Tuple
+
+from backend import db
+from backend.config import Telegram
+from backend.logger import LOGGER
+
+
+SUMMARY_FIELDS = (
+    "tmdb_id", "title", "genres", "description", "rating", "release_year",
+    "poster", "backdrop", "media_type", "updated_on", "languages", "rip",
+    "runtime", "total_seasons", "total_episodes", "provisional"
+)
+
+# Sort orders kept warm after every change; anything else is built on demand.
+INDEXED_SORTS = ("rating", "release_year", "updated_on")
+
+
+class CatalogEntry:
+    """Compact, read-only summary of one title."""
+    __slots__ = SUMMARY_FIELDS
+
+    def __init__(self, doc: dict):
+        for field in SUMMARY_FIELDS:
+            setattr(self, field, doc.get(field))
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in SUMMARY_FIELDS if getattr(self, field) is not None}
+
+
+def _sort_value(value):
+    # Missing fields sort lowest, like they do in MongoDB.
+    return (value is not None, value)
+
+
+class _Descending:
+    """Wraps a sort value so it compares in reverse."""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+
+def _order_key(sort_params: Tuple[Tuple[str, str], ...]):
+    """Key of an entry's place in a sorted listing, for bisecting into it."""
+    def key(entry: CatalogEntry) -> tuple:
+        return tuple(
+            _sort_value(getattr(entry, field)) if direction == "asc"
+            else _Descending(_sort_value(getattr(entry, field)))
+            for field, direction in sort_params)
+    return key
+
+
+class Catalog:
+    """
+    Optional in-process copy of every title summary. Listing and similar
+    requests are answered from it without touching MongoDB; it follows the
+    database by polling updated_on and by listening to local writes.
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self.ready = False
+        self._entries: Dict[str, Dict[int, CatalogEntry]] = {"movie": {}, "tv": {}}
+        self._genres: Dict[str, Dict[str, Set[int]]] = {"movie": {}, "tv": {}}
+        self._sorted: Dict[str, Dict[Tuple, List[CatalogEntry]]] = {"movie": {}, "tv": {}}
+        self._watermark: Optional[datetime] = None
+        self._last_full_load = 0.0
+
+    def _put(self, media_type: str, doc: dict) -> None:
+        self._remove(media_type, doc["tmdb_id"])
+        entry = CatalogEntry(doc)
+        self._entries[media_type][entry.tmdb_id] = entry
+        for genre in entry.genres or ():
+            self._genres[media_type].setdefault(genre, set()).add(entry.tmdb_id)
+        if entry.updated_on and (self._watermark is None or entry.updated_on > self._watermark):
+            self._watermark = entry.updated_on
+        for sort_params, ordered in self._sorted[media_type].items():
+            insort(ordered, entry, key=_order_key(sort_params))
+
+    def _remove(self, media_type: str, tmdb_id: int) -> None:
+        entry = self._entries[media_type].pop(tmdb_id, None)
+        if entry is None:
+            return
+        for genre in entry.genres or ():
+            ids = self._genres[media_type].get(genre)
+            if ids is not None:
+                ids.discard(tmdb_id)
+        for sort_params, ordered in self._sorted[media_type].items():
+            key = _order_key(sort_params)
+            # Start of the entry's run of equal keys; it is somewhere in that run.
+            i = bisect_left(ordered, key(entry), key=key)
+            while i < len(ordered) and ordered[i] is not entry:
+                i += 1
+            if i < len(ordered):
+                del ordered[i]
+
+    def _warm(self, media_types=None) -> None:
+        for media_type in media_types or self._entries:
+            for field in INDEXED_SORTS:
+                self._sorted_entries(media_type, ((field, "desc"),))
+
+    async def load(self) -> None:
+        """Replace the snapshot with a full read of every shard."""
+        started = monotonic()
+        entries: Dict[str, Dict[int, CatalogEntry]] = {"movie": {}, "tv": {}}
+        genres: Dict[str, Dict[str, Set[int]]] = {"movie": {}, "tv": {}}
+        watermark = None
+        for media_type in entries:
+            for doc in await self.database.summaries_since(media_type, None):
+                entry = CatalogEntry(doc)
+                entries[media_type][entry.tmdb_id] = entry
+                for genre in entry.genres or ():
+                    genres[media_type].setdefault(genre, set()).add(entry.tmdb_id)
+                if entry.updated_on and (watermark is None or entry.updated_on > watermark):
+                    watermark = entry.updated_on
+        self._entries, self._genres, self._watermark = entries, genres, watermark
+        self._sorted = {"movie": {}, "tv": {}}
+        self._warm()
+        self._last_full_load = monotonic()
+        self.ready = True
+        LOGGER.info(
+            f"Catalog snapshot loaded: {len(entries['movie'])} movies, {len(entries['tv'])} tv shows "
+            f"in {monotonic() - started:.2f}s")
+
+    async def refresh(self) -> None:
+        """Pull titles changed since the newest updated_on already held."""
+        changed: Dict[str, int] = {}
+        for media_type in self._entries:
+            for doc in await self.database.summaries_since(media_type, self._watermark):
+                # The query includes the watermark itself, so the newest
+                # title held comes back on every poll.
+                held = self._entries[media_type].get(doc["tmdb_id"])
+                if held is not None and held.updated_on == doc.get("updated_on"):
+                    continue
+                self._put(media_type, doc)
+                changed[media_type] = changed.get(media_type, 0) + 1
+        if changed:
+            self._warm(changed)
+            LOGGER.debug(f"Catalog snapshot refreshed {sum(changed.values())} titles")
+
+    async def on_catalog_change(self, event: dict) -> None:
+        """
+        Database listener: apply local writes without waiting for the next
+        poll. The changed title is moved within each cached sort order.
+        """
+        if not self.ready:
+            return
+        media_type, tmdb_id = event["media_type"], event["tmdb_id"]
+        if event["action"] == "delete":
+            self._remove(media_type, tmdb_id)
+        else:
+            docs = await self.database.summaries_for(media_type, [tmdb_id])
+            for doc in docs:
+                self._put(media_type, doc)
+
+    async def run_refresh(self) -> None:
+        """
+        Background task: poll for changes, and reload everything now and then
+        so deletions made by other processes are dropped as well.
+        """
+        while True:
+            await asleep(Telegram.CATALOG_REFRESH_INTERVAL)
+            try:
+                if monotonic() - self._last_full_load >= Telegram.CATALOG_FULL_RELOAD_INTERVAL:
+                    await self.load()
+                else:
+                    await self.refresh()
+            except Exception as e:
+                LOGGER.error(f"Error refreshing catalog snapshot: {e}")
+
+    async def start(self) -> None:
+        await self.load()
+        get_running_loop().create_task(self.run_refresh())
+
+    def _sorted_entries(self, media_type: str, sort_params: Tuple[Tuple[str, str], ...]) -> List[CatalogEntry]:
+        ordered = self._sorted[media_type].get(sort_params)
+        if ordered is None:
+            ordered = list(self._entries[media_type].values())
+            for field, direction in reversed(sort_params):
+                ordered.sort(key=lambda e: _sort_value(getattr(e, field)), reverse=direction != "asc")
+            self._sorted[media_type][sort_params] = ordered
+        return ordered
+
+    def listing(self, media_type: str, sort_params: List[Tuple[str, str]], page: int, page_size: int) -> Optional[Tuple[int, List[dict]]]:
+        """One page of summaries, or None when a sort field is not part of the snapshot."""
+        if any(field not in SUMMARY_FIELDS for field, _ in sort_params):
+            return None
+        ordered = self._sorted_entries(media_type, tuple(tuple(param) for param in sort_params))
+        skip = (page - 1) * page_size
+        return len(ordered), [entry.to_dict() for entry in ordered[skip:skip + page_size]]
+
+    def similar(self, media_type: str, tmdb_id: int, page: int, page_size: int) -> Optional[Tuple[int, List[dict]]]:
+        """Titles sharing most genres with the parent, best rated first; None if unknown."""
+        parent = self._entries[media_type].get(tmdb_id)
+        if parent is None:
+            return None
+        scores: Dict[int, int] = {}
+        for genre in parent.genres or ():
+            for other in self._genres[media_type].get(genre, ()):
+                if other != tmdb_id:
+                    scores[other] = scores.get(other, 0) + 1
+        entries = self._entries[media_type]
+        ranked = sorted(
+            scores, key=lambda i: (scores[i], _sort_value(entries[i].rating)), reverse=True
+        )[:Telegram.SIMILAR_TOP_K]
+        skip = (page - 1) * page_size
+        return len(ranked), [entries[i].to_dict() for i in ranked[skip:skip + page_size]]
+
+
+catalog = Catalog(db)
@@ -1,10 +1,16 @@
-from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Union
+from asyncio import Queue, gather, sleep as asleep
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, timedelta
+from hashlib import blake2b
+from heapq import nlargest
+from inspect import isawaitable
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlparse
 from bson import ObjectId
 from fastapi import HTTPException
 import motor.motor_asyncio
 from pydantic import ValidationError
-from pymongo import ASCENDING, DESCENDING
+from pymongo import ASCENDING, DESCENDING, UpdateOne
 
 from backend.logger import LOGGER
 from backend.config import Telegram
@@ -12,51 +18,287 @@ from backend.helper.encrypt import encode_string
 from backend.helper.modal import Episode, MovieSchema, QualityDetail, Season, TVShowSchema
 
 
+# Fields needed to render a poster card. Listing, similar and search results
+# only carry these; the nested seasons/telegram data stays on /api/id.
+SUMMARY_PROJECTION = {
+    "_id": 0, "tmdb_id": 1, "title": 1, "genres": 1, "description": 1,
+    "rating": 1, "release_year": 1, "poster": 1, "backdrop": 1,
+    "media_type": 1, "updated_on": 1, "languages": 1, "rip": 1,
+    "runtime": 1, "total_seasons": 1, "total_episodes": 1, "provisional": 1
+}
+
+# Telegram files live in their own collection, one row per quality of a movie
+# or episode, so show documents stay small and lookups hit a single index.
+FILE_KEY = ("tmdb_id", "media_type", "season_number", "episode_number", "quality")
+FILE_PROJECTION = {"_id": 0, "season_number": 1, "episode_number": 1, "quality": 1, "id": 1, "name": 1, "size": 1}
+
+# Title fields clients can filter on. `qualities` mirrors the distinct
+# qualities in the files collection so it can be indexed with the title.
+FACET_FIELDS = ("genres", "languages", "release_year", "rip", "qualities")
+
+# A changed title is re-ranked into at most this many times SIMILAR_TOP_K
+# neighbour lists (its best matches); the periodic rebuild settles the rest.
+SIMILAR_FANOUT = 4
+SIMILAR_WRITE_BATCH = 1000
+
+
+class Shard:
+    """One MongoDB cluster holding a slice of the catalog."""
+
+    def __init__(self, uri: str, db_name: str):
+        parsed = urlparse(uri)
+        # Credentials are left out so rotating a password does not move titles.
+        self.name = f"{parsed.hostname}{parsed.path.rstrip('/')}" if parsed.hostname else uri
+        self.client = motor.motor_asyncio.AsyncIOMotorClient(uri)
+        self.db = self.client[db_name]
+        self.tv = self.db["tv"]
+        self.movie = self.db["movie"]
+        self.files = self.db["files"]
+        self.similar = self.db["similar"]
+        self.tombstones = self.db["tombstones"]
+
+    def collection(self, media_type: str):
+        return self.movie if media_type == "movie" else self.tv
+
+    def close(self):
+        self.client.close()
+
+
+def shard_for(tmdb_id: int, shards: List[Shard]) -> Shard:
+    """
+    Rendezvous hashing on tmdb_id: stable across processes, and adding a
+    cluster only moves the titles that now hash to it.
+    """
+    def weight(shard: Shard) -> int:
+        digest = blake2b(f"{shard.name}:{tmdb_id}".encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big")
+    return max(shards, key=weight)
+
+
+def _sort_value(value):
+    # Missing fields sort lowest, like they do in MongoDB.
+    return (value is not None, value)
+
+
+def _facet_values(doc: Optional[dict]) -> set:
+    """(field, value) pairs a title contributes to the facet counts."""
+    values = set()
+    for field in FACET_FIELDS:
+        value = (doc or {}).get(field)
+        for item in value if isinstance(value, list) else [value]:
+            if item is not None:
+                values.add((field, item))
+    return values
+
+
+# A change-feed position: (updated_on, tmdb_id, media_type) of the last change
+# a client has seen. Changes are ordered by that tuple.
+ChangeKey = Tuple[datetime, int, str]
+
+
+def encode_cursor(key: ChangeKey) -> str:
+    updated_on, tmdb_id, media_type = key
+    raw = f"{updated_on.isoformat()}|{tmdb_id}|{media_type}"
+    return urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> ChangeKey:
+    """Raises ValueError for anything encode_cursor did not produce."""
+    try:
+        raw = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        updated_on, tmdb_id, media_type = raw.split("|")
+        return datetime.fromisoformat(updated_on), int(tmdb_id), media_type
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
 class Database:
-    def __init__(self, connection_uri: str = Telegram.DATABASE, db_name: str = "projectS"):
-        self._conn = None
+    def __init__(self, connection_uri: Union[str, List[str]] = Telegram.DATABASE, db_name: str = "projectS"):
+        self.shards: List[Shard] = []
         self.db = None
-        self.tv_collection = None
-        self.movie_collection = None
         self.deploy_config = None
+        self.facets = None
         self.connection_uri = connection_uri
+        self.connection_uris = [connection_uri] if isinstance(connection_uri, str) else list(connection_uri)
         self.db_name = db_name
+        self._listeners: List[Callable] = []
+        self._similar_queue: Queue = Queue()
+        # Newest catalog write known to this process; API validators derive from it.
+        self.last_modified = datetime.utcnow()
+        self._similar_pending: set = set()
 
     async def connect(self):
-        """Establish a connection to the database."""
+        """Establish a connection to every configured cluster."""
         try:
-            if self._conn is not None:
-                await self._conn.close()
+            self._close_shards()
+            self.shards = [Shard(uri, self.db_name) for uri in self.connection_uris]
 
-            self._conn = motor.motor_asyncio.AsyncIOMotorClient(self.connection_uri)
-            self.db = self._conn[self.db_name]
-
-            # Ensure collections are assigned
-            self.tv_collection = self.db["tv"]
-            self.movie_collection = self.db["movie"]
+            # Non-catalog collections (users, deploy config, ...) live on the first cluster.
+            self.db = self.shards[0].db
             self.deploy_config = self.db["deploy_config"]  
+            self.facets = self.db["facets"]
 
-            LOGGER.info("Database connection established")
-        
-            # Debug: Print available collections
-           # collections = await self.db.list_collection_names()
-           # LOGGER.info(f"Available collections: {collections}")
+            await self.ensure_indexes()
+            await self._load_last_modified()
+            LOGGER.info(f"Database connection established ({len(self.shards)} shard(s))")
 
         except Exception as e:
             LOGGER.error(f"Error connecting to the database: {e}")
-            self._conn = None
+            self._close_shards()
             self.db = None
-        
+
+    async def _load_last_modified(self) -> None:
+        newest = await gather(*(
+            collection.find_one({}, {"updated_on": 1}, sort=[("updated_on", DESCENDING)])
+            for shard in self.shards for collection in (shard.tv, shard.movie, shard.tombstones)))
+        stamps = [doc["updated_on"] for doc in newest if doc and doc.get("updated_on")]
+        if stamps:
+            self.last_modified = max(stamps)
+
+    def touch(self, moment: Optional[datetime] = None) -> None:
+        """Record a catalog write, here or (when known) on another process."""
+        moment = moment or datetime.utcnow()
+        if moment > self.last_modified:
+            self.last_modified = moment
+
+    def _close_shards(self):
+        for shard in self.shards:
+            shard.close()
+        self.shards = []
 
     async def disconnect(self):
-        """Close the database connection."""
-        if self._conn is not None:
-            await self._conn.close()
+        """Close the database connections."""
+        if self.shards:
+            self._close_shards()
             LOGGER.info("Database connection closed")
-        self._conn = None
         self.db = None
-        self.tv_collection = None
-        self.movie_collection = None
+
+    async def ensure_indexes(self):
+        """Create the indexes the read paths rely on. Safe to call repeatedly."""
+        for shard in self.shards:
+            await shard.tv.create_index("tmdb_id")
+            await shard.movie.create_index("tmdb_id")
+            # Serves summaries_since and the change feed's (updated_on, tmdb_id) order.
+            for collection in (shard.tv, shard.movie, shard.tombstones):
+                await collection.create_index([("updated_on", ASCENDING), ("tmdb_id", ASCENDING)])
+            await shard.tombstones.create_index(
+                "updated_on", expireAfterSeconds=Telegram.CHANGE_FEED_RETENTION)
+            # Filter field first, then the default sort. Array fields cannot
+            # share a compound index, so there is one per facet.
+            for collection in (shard.tv, shard.movie):
+                for field in FACET_FIELDS:
+                    await collection.create_index([(field, ASCENDING), ("rating", DESCENDING)])
+            await shard.files.create_index(
+                [(key, ASCENDING) for key in FILE_KEY], unique=True, name="file_key")
+            # Play counts arrive keyed by the encoded file id.
+            await shard.files.create_index("id")
+            await shard.tv.create_index([("plays", DESCENDING)])
+            await shard.movie.create_index([("plays", DESCENDING)])
+            await shard.similar.create_index(
+                [("media_type", ASCENDING), ("tmdb_id", ASCENDING)], unique=True)
+            await shard.similar.create_index(
+                [("media_type", ASCENDING), ("neighbours.tmdb_id", ASCENDING)])
+        await self.facets.create_index([("media_type", ASCENDING), ("field", ASCENDING)])
+        await self.db["metadata_cache"].create_index("expires_at", expireAfterSeconds=0)
+
+    def _shard(self, tmdb_id: int) -> Shard:
+        return shard_for(tmdb_id, self.shards)
+
+    def _collection(self, media_type: str, tmdb_id: int):
+        return self._shard(tmdb_id).collection(media_type)
+
+    async def _find_existing(
+        self,
+        media_type: str,
+        query: dict,
+        projection: Optional[dict] = None
+    ) -> Tuple[Optional[Shard], Optional[dict]]:
+        """Look a title up on every shard at once; returns the shard holding it."""
+        docs = await gather(*(
+            shard.collection(media_type).find_one(query, projection) for shard in self.shards))
+        for shard, doc in zip(self.shards, docs):
+            if doc:
+                return shard, doc
+        return None, None
+
+    async def locate(self, media_type: str, tmdb_ids: List[int]) -> Dict[int, Shard]:
+        """
+        The shard each title is stored on, which is not its home shard until
+        rebalance has moved it. Titles that do not exist are left out.
+        """
+        if not tmdb_ids:
+            return {}
+        results = await gather(*(
+            shard.collection(media_type).find({"tmdb_id": {"$in": tmdb_ids}}, {"_id": 0, "tmdb_id": 1}).to_list(None)
+            for shard in self.shards))
+        located: Dict[int, Shard] = {}
+        for shard, docs in zip(self.shards, results):
+            for doc in docs:
+                # A title mid-move may briefly be on two shards; prefer home.
+                if doc["tmdb_id"] not in located or shard is self._shard(doc["tmdb_id"]):
+                    located[doc["tmdb_id"]] = shard
+        return located
+
+    async def _stored_shard(self, media_type: str, tmdb_id: int) -> Optional[Shard]:
+        """
+        The shard a title is stored on when that is not its home shard (after a
+        cluster was added, until rebalance moves it); None otherwise. Read paths
+        try home first and only ask this on a miss.
+        """
+        if len(self.shards) < 2:
+            return None
+        shard = (await self.locate(media_type, [tmdb_id])).get(tmdb_id)
+        return shard if shard is not self._shard(tmdb_id) else None
+
+    async def summaries_for(self, media_type: str, tmdb_ids: List[int]) -> List[dict]:
+        """Summary documents for the given titles, in the given order."""
+        by_shard: Dict[Shard, List[int]] = {}
+        for tmdb_id in tmdb_ids:
+            by_shard.setdefault(self._shard(tmdb_id), []).append(tmdb_id)
+        results = await gather(*(
+            shard.collection(media_type).find({"tmdb_id": {"$in": ids}}, SUMMARY_PROJECTION).to_list(None)
+            for shard, ids in by_shard.items()))
+        by_id = {doc["tmdb_id"]: doc for docs in results for doc in docs}
+        missing = [i for i in tmdb_ids if i not in by_id]
+        if missing and len(self.shards) > 1:
+            # Titles not yet rebalanced onto a newly added cluster.
+            results = await gather(*(
+                shard.collection(media_type).find({"tmdb_id": {"$in": missing}}, SUMMARY_PROJECTION).to_list(None)
+                for shard in self.shards))
+            by_id.update((doc["tmdb_id"], doc) for docs in results for doc in docs)
+        return [by_id[i] for i in tmdb_ids if i in by_id]
+
+    async def summaries_since(self, media_type: str, since: Optional[datetime]) -> List[dict]:
+        """Summary documents updated at or after `since` (all of them when None), from every shard."""
+        query = {"updated_on": {"$gte": since}} if since else {}
+        results = await gather(*(
+            shard.collection(media_type).find(query, SUMMARY_PROJECTION).to_list(None)
+            for shard in self.shards))
+        docs = [doc for docs in results for doc in docs]
+        # The catalog and typeahead polls also bring in other processes' writes.
+        for doc in docs:
+            if doc.get("updated_on"):
+                self.touch(doc["updated_on"])
+        return docs
+
+    def add_listener(self, callback: Callable) -> None:
+        """
+        Register a callback (plain or async) invoked with an event dict after
+        every catalog write: {"action": "upsert"|"delete", "media_type": "movie"|"tv",
+        "tmdb_id": ..., ...}.
+        """
+        self._listeners.append(callback)
+
+    async def _notify(self, action: str, media_type: str, tmdb_id: int, **extra) -> None:
+        event = {"action": action, "media_type": media_type, "tmdb_id": tmdb_id, **extra}
+        self.touch()
+        for callback in self._listeners:
+            try:
+                result = callback(event)
+                if isawaitable(result):
+                    await result
+            except Exception as e:
+                LOGGER.error(f"Error in catalog listener {callback}: {e}")
 
     @staticmethod
     def _convert_object_id(document: dict) -> dict:
@@ -66,6 +308,170 @@ class Database:
         return document
 
     
+    @staticmethod
+    def _file_records(
+        tmdb_id: int,
+        media_type: str,
+        telegram: Optional[List[dict]],
+        season_number: Optional[int] = None,
+        episode_number: Optional[int] = None
+    ) -> List[dict]:
+        """Flatten a telegram quality list into rows for the files collection."""
+        return [
+            {
+                "tmdb_id": tmdb_id,
+                "media_type": media_type,
+                "season_number": season_number,
+                "episode_number": episode_number,
+                "quality": quality["quality"],
+                "id": quality["id"],
+                "name": quality["name"],
+                "size": quality["size"],
+            }
+            for quality in telegram or []
+        ]
+
+    @classmethod
+    def _split_tv_files(cls, tmdb_id: int, seasons: List[dict]) -> List[dict]:
+        """Pop embedded telegram lists off the episodes and return them as file rows."""
+        records = []
+        for season in seasons:
+            for episode in season.get("episodes", []):
+                records.extend(cls._file_records(
+                    tmdb_id, "tv", episode.pop("telegram", None),
+                    season["season_number"], episode["episode_number"]))
+        return records
+
+    async def upsert_files(self, records: List[dict], shard: Optional[Shard] = None) -> None:
+        """
+        Insert or replace file rows, one per (title, season, episode, quality).
+        When several records share a key the last one wins, so callers list
+        migrated legacy rows before the file just uploaded. Rows go to
+        `shard`, the one their title is stored on, which is not the home
+        shard until rebalance has moved the title; by default the home shard.
+        """
+        if not records:
+            return
+        now = datetime.utcnow()
+        # The bulk writes are unordered, so duplicates must not reach them.
+        latest = {tuple(record[key] for key in FILE_KEY): record for record in records}
+        requests: Dict[Shard, List[UpdateOne]] = {}
+        for record in latest.values():
+            requests.setdefault(shard or self._shard(record["tmdb_id"]), []).append(UpdateOne(
+                {key: record[key] for key in FILE_KEY},
+                {"$set": {**record, "updated_on": now}},
+                upsert=True
+            ))
+        await gather(*(shard.files.bulk_write(ops, ordered=False) for shard, ops in requests.items()))
+
+    async def _files_for(
+        self,
+        shard: Shard,
+        tmdb_id: int,
+        media_type: str,
+        season_number: Optional[int] = None,
+        episode_number: Optional[int] = None
+    ) -> List[dict]:
+        query = {"tmdb_id": tmdb_id, "media_type": media_type}
+        if season_number is not None:
+            query["season_number"] = season_number
+        if episode_number is not None:
+            query["episode_number"] = episode_number
+        return await shard.files.find(query, FILE_PROJECTION).to_list(None)
+
+    @staticmethod
+    def _attach_tv_files(seasons: List[dict], files: List[dict]) -> None:
+        """Put file rows back onto their episodes so API consumers see the nested shape."""
+        by_episode: Dict[Tuple[int, int], List[dict]] = {}
+        for file in files:
+            by_episode.setdefault((file["season_number"], file["episode_number"]), []).append(
+                {"quality": file["quality"], "id": file["id"], "name": file["name"], "size": file["size"]})
+        for season in seasons:
+            for episode in season.get("episodes", []):
+                episode["telegram"] = by_episode.get((season["season_number"], episode["episode_number"]), [])
+
+    async def _with_qualities(self, media_type: str, doc: dict, shard: Optional[Shard] = None) -> dict:
+        """
+        Copy of the facet fields of a stored title, filling in `qualities`
+        from its file rows (on `shard`, by default the home shard) when the
+        title predates that field.
+        """
+        previous = {field: doc.get(field) for field in FACET_FIELDS}
+        if previous["qualities"] is None:
+            previous["qualities"] = await (shard or self._shard(doc["tmdb_id"])).files.distinct(
+                "quality", {"tmdb_id": doc["tmdb_id"], "media_type": media_type})
+            previous["qualities"].extend(
+                quality["quality"] for quality in doc.get("telegram") or [])
+            for season in doc.get("seasons") or []:
+                for episode in season.get("episodes", []):
+                    previous["qualities"].extend(
+                        quality["quality"] for quality in episode.get("telegram") or [])
+        return previous
+
+    async def _update_facets(self, media_type: str, before: Optional[dict], after: Optional[dict]) -> None:
+        """Apply the difference between a title's old and new facet values to the counts."""
+        old, new = _facet_values(before), _facet_values(after)
+        requests = [
+            UpdateOne(
+                {"_id": f"{media_type}|{field}|{value}"},
+                {"$inc": {"count": delta}, "$set": {"media_type": media_type, "field": field, "value": value}},
+                upsert=True)
+            for delta, pairs in ((1, new - old), (-1, old - new))
+            for field, value in pairs
+        ]
+        if requests:
+            try:
+                await self.facets.bulk_write(requests, ordered=False)
+            except Exception as e:
+                LOGGER.error(f"Error updating facet counts: {e}")
+
+    async def facet_counts(self, media_type: str) -> Dict[str, Dict[str, int]]:
+        """Titles per value of every facet field, e.g. {"genres": {"Drama": 120, ...}, ...}."""
+        counts: Dict[str, Dict[str, int]] = {field: {} for field in FACET_FIELDS}
+        async for doc in self.facets.find({"media_type": media_type, "count": {"$gt": 0}}):
+            counts[doc["field"]][str(doc["value"])] = doc["count"]
+        return counts
+
+    async def rebuild_facets(self) -> None:
+        """
+        Recompute `qualities` on every title and the facet counts from scratch.
+        Only needed once for catalogs written before facets existed.
+        """
+        totals: Dict[Tuple[str, str, object], int] = {}
+        for shard in self.shards:
+            async for row in shard.files.aggregate([
+                {"$group": {"_id": {"tmdb_id": "$tmdb_id", "media_type": "$media_type"},
+                            "qualities": {"$addToSet": "$quality"}}}
+            ]):
+                await shard.collection(row["_id"]["media_type"]).update_one(
+                    {"tmdb_id": row["_id"]["tmdb_id"]}, {"$set": {"qualities": sorted(row["qualities"])}})
+            for media_type in ("movie", "tv"):
+                async for doc in shard.collection(media_type).find({}, {field: 1 for field in FACET_FIELDS}):
+                    for field, value in _facet_values(doc):
+                        key = (media_type, field, value)
+                        totals[key] = totals.get(key, 0) + 1
+        await self.facets.delete_many({})
+        if totals:
+            await self.facets.insert_many([
+                {"_id": f"{media_type}|{field}|{value}", "media_type": media_type,
+                 "field": field, "value": value, "count": count}
+                for (media_type, field, value), count in totals.items()
+            ])
+
+    @staticmethod
+    def _identity_query(media: dict) -> dict:
+        """
+        Stored document a write should merge into. Placeholders are matched
+        by their provisional id only, so a guessed title never merges into a
+        real one and vice versa.
+        """
+        if media.get("provisional"):
+            return {"tmdb_id": media["tmdb_id"]}
+        return {"$or": [
+            {"tmdb_id": media["tmdb_id"]},
+            {"title": media["title"], "release_year": media["release_year"], "provisional": {"$ne": True}}
+        ]}
+
     async def update_tv_show(self, tv_show_data: TVShowSchema) -> Optional[ObjectId]:
         try:
             tv_show_dict = tv_show_data.dict()
@@ -73,18 +479,23 @@ class Database:
             LOGGER.error(f"Validation error: {e}")
             return None
 
-        existing_media = await self.tv_collection.find_one({
-            "$or": [
-                {"tmdb_id": tv_show_dict["tmdb_id"]},
-                {"title": tv_show_dict["title"], "release_year": tv_show_dict["release_year"]}
-            ]
-        })
+        shard, existing_media = await self._find_existing("tv", self._identity_query(tv_show_dict))
 
         if not existing_media:
-            result = await self.tv_collection.insert_one(tv_show_dict)
+            files = self._split_tv_files(tv_show_dict["tmdb_id"], tv_show_dict["seasons"])
+            tv_show_dict["qualities"] = sorted({file["quality"] for file in files})
+            result = await self._collection("tv", tv_show_dict["tmdb_id"]).insert_one(tv_show_dict)
+            await self.upsert_files(files)
+            await self._update_facets("tv", None, tv_show_dict)
             return result.inserted_id
 
-        updated = False
+        tmdb_id = existing_media["tmdb_id"]
+        previous = await self._with_qualities("tv", existing_media, shard)
+        # Documents written before the files collection existed still embed
+        # their telegram lists; move them out on first touch.
+        files = self._split_tv_files(tmdb_id, existing_media["seasons"])
+        files.extend(self._split_tv_files(tmdb_id, tv_show_dict["seasons"]))
+
         for season in tv_show_dict["seasons"]:
             existing_season = next(
                 (s for s in existing_media["seasons"] 
@@ -92,42 +503,23 @@ class Database:
             
             if existing_season:
                 for episode in season["episodes"]:
-                    existing_episode = next(
-                        (e for e in existing_season["episodes"] 
-                         if e["episode_number"] == episode["episode_number"]), None)
-                    
-                    if existing_episode:
-                        for quality in episode["telegram"]:
-                            existing_quality = next(
-                                (q for q in existing_episode["telegram"] 
-                                 if q["quality"] == quality["quality"]), None)
-                            
-                            if existing_quality:
-                                existing_quality.update(quality)
-                                updated = True
-                            else:
-                                existing_episode["telegram"].append(quality)
-                                updated = True
-                    else:
+                    if not any(e["episode_number"] == episode["episode_number"]
+                               for e in existing_season["episodes"]):
                         existing_season["episodes"].append(episode)
-                        updated = True
             else:
                 existing_media["seasons"].append(season)
-                updated = True
-
-        if updated:
-            existing_media["updated_on"] = datetime.utcnow()
-            existing_media["languages"] = tv_show_dict["languages"]
-            existing_media["rip"] = tv_show_dict["rip"]
-            await self.tv_collection.replace_one(
-                {"tmdb_id": tv_show_dict["tmdb_id"]}, existing_media)
-            return existing_media["_id"]
-        else:
-            LOGGER.info(f"No updates made for: {tv_show_dict['tmdb_id']}")
-            return existing_media["_id"]
+
+        existing_media["updated_on"] = datetime.utcnow()
+        existing_media["languages"] = tv_show_dict["languages"]
+        existing_media["rip"] = tv_show_dict["rip"]
+        existing_media["qualities"] = sorted(set(previous["qualities"]) | {file["quality"] for file in files})
+        await shard.tv.replace_one({"_id": existing_media["_id"]}, existing_media)
+        await self.upsert_files(files, shard)
+        await self._update_facets("tv", previous, existing_media)
+        return existing_media["_id"]
 
     async def update_movie(self, movie_data: MovieSchema) -> Optional[ObjectId]:
-        if self.movie_collection is None:
+        if not self.shards:
             LOGGER.error("Database collection is not initialized. Did you call db.connect()?")
             return None
         try:
@@ -136,40 +528,29 @@ class Database:
             LOGGER.error(f"Validation error: {e}")
             return None
 
-        existing_media = await self.movie_collection.find_one({
-            "$or": [
-                {"tmdb_id": movie_dict["tmdb_id"]},
-                {"title": movie_dict["title"], "release_year": movie_dict["release_year"]}
-            ]
-        })
+        shard, existing_media = await self._find_existing("movie", self._identity_query(movie_dict))
 
         if not existing_media:
-            result = await self.movie_collection.insert_one(movie_dict)
+            files = self._file_records(movie_dict["tmdb_id"], "movie", movie_dict.pop("telegram", None))
+            movie_dict["qualities"] = sorted({file["quality"] for file in files})
+            result = await self._collection("movie", movie_dict["tmdb_id"]).insert_one(movie_dict)
+            await self.upsert_files(files)
+            await self._update_facets("movie", None, movie_dict)
             return result.inserted_id
 
-        updated = False
-        for quality in movie_dict["telegram"]:
-            existing_quality = next(
-                (q for q in existing_media["telegram"] 
-                 if q["quality"] == quality["quality"]), None)
-            
-            if existing_quality:
-                existing_quality.update(quality)
-                updated = True
-            else:
-                existing_media["telegram"].append(quality)
-                updated = True
-
-        if updated:
-            existing_media["updated_on"] = datetime.utcnow()
-            existing_media["languages"] = movie_dict["languages"]
-            existing_media["rip"] = movie_dict["rip"]
-            await self.movie_collection.replace_one(
-                {"tmdb_id": movie_dict["tmdb_id"]}, existing_media)
-            return existing_media["_id"]
-        else:
-            LOGGER.info(f"No updates made for: {movie_dict['tmdb_id']}")
-            return existing_media["_id"]
+        tmdb_id = existing_media["tmdb_id"]
+        previous = await self._with_qualities("movie", existing_media, shard)
+        files = self._file_records(tmdb_id, "movie", existing_media.pop("telegram", None))
+        files.extend(self._file_records(tmdb_id, "movie", movie_dict["telegram"]))
+
+        existing_media["updated_on"] = datetime.utcnow()
+        existing_media["languages"] = movie_dict["languages"]
+        existing_media["rip"] = movie_dict["rip"]
+        existing_media["qualities"] = sorted(set(previous["qualities"]) | {file["quality"] for file in files})
+        await shard.movie.replace_one({"_id": existing_media["_id"]}, existing_media)
+        await self.upsert_files(files, shard)
+        await self._update_facets("movie", previous, existing_media)
+        return existing_media["_id"]
 
     async def insert_media(
         self,
@@ -197,6 +578,7 @@ class Database:
                 media_type=metadata_info['media_type'],
                 languages=metadata_info['languages'],
                 rip=metadata_info['rip'],
+                provisional=metadata_info.get('provisional', False),
                 telegram=[
                     QualityDetail(
                         quality=metadata_info['quality'],
@@ -205,7 +587,7 @@ class Database:
                         size=size
                     )]
             )
-            return await self.update_movie(media)
+            doc_id = await self.update_movie(media)
         else:
             tv_show = TVShowSchema(
                 tmdb_id=metadata_info['tmdb_id'],
@@ -222,6 +604,7 @@ class Database:
                 total_episodes=metadata_info['total_episodes'],
                 languages=metadata_info['languages'],
                 rip=metadata_info['rip'],
+                provisional=metadata_info.get('provisional', False),
                 seasons=[
                     Season(
                         season_number=metadata_info['season_number'],
@@ -243,30 +626,72 @@ class Database:
                     )
                 ]
             )
-            return await self.update_tv_show(tv_show)
+            doc_id = await self.update_tv_show(tv_show)
 
-    async def sort_tv_shows(
-        self, 
-        sort_params: List[Tuple[str, str]], 
-        page: int, 
-        page_size: int
-    ) -> dict:
+        if doc_id is None:
+            return None
+
+        media_type = "movie" if metadata_info['media_type'] == "movie" else "tv"
+        _, media = await self._find_existing(media_type, {"_id": doc_id}, {"tmdb_id": 1})
+        self.schedule_similar(media_type, media["tmdb_id"])
+        await self._notify(
+            "upsert", media_type, media["tmdb_id"],
+            season_number=metadata_info.get('season_number'),
+            episode_number=metadata_info.get('episode_number'),
+            quality=metadata_info['quality']
+        )
+        return doc_id
+
+    async def _sort_media(
+        self,
+        media_type: str,
+        sort_params: List[Tuple[str, str]],
+        page: int,
+        page_size: int,
+        query: Optional[dict] = None
+    ) -> Tuple[int, List[dict]]:
         skip = (page - 1) * page_size
         sort_criteria = [(field, ASCENDING if direction == "asc" else DESCENDING) 
                         for field, direction in sort_params]
-        
+        single = len(self.shards) == 1
+        # With several shards every shard returns its own top skip+page_size
+        # and the page is cut after merging.
+        window = [{"$skip": skip}, {"$limit": page_size}] if single else [{"$limit": skip + page_size}]
+        extra_fields = [field for field, _ in sort_criteria if field not in SUMMARY_PROJECTION]
+        projection = {**SUMMARY_PROJECTION, **{field: 1 for field in extra_fields}}
+
         pipeline = [
+            {"$match": query or {}},
             {"$sort": dict(sort_criteria)},
             {"$facet": {
                 "metadata": [{"$count": "total_count"}],
-                "data": [{"$skip": skip}, {"$limit": page_size}]
+                "data": window + [{"$project": projection}]
             }}
         ]
         
-        result = await self.tv_collection.aggregate(pipeline).to_list(1)
-        total_count = result[0]["metadata"][0]["total_count"] if result[0]["metadata"] else 0
-        sorted_shows = [TVShowSchema(**doc) for doc in result[0]["data"]]
-        return {"total_count": total_count, "tv_shows": sorted_shows}
+        results = await gather(*(
+            shard.collection(media_type).aggregate(pipeline).to_list(1) for shard in self.shards))
+        total_count = sum(r[0]["metadata"][0]["total_count"] for r in results if r[0]["metadata"])
+        docs = [doc for r in results for doc in r[0]["data"]]
+        if single:
+            return total_count, docs
+
+        for field, direction in reversed(sort_criteria):
+            docs.sort(key=lambda doc: _sort_value(doc.get(field)), reverse=direction == DESCENDING)
+        docs = docs[skip:skip + page_size]
+        for doc in docs:
+            for field in extra_fields:
+                doc.pop(field, None)
+        return total_count, docs
+
+    async def sort_tv_shows(
+        self, 
+        sort_params: List[Tuple[str, str]], 
+        page: int, 
+        page_size: int
+    ) -> dict:
+        total_count, docs = await self._sort_media("tv", sort_params, page, page_size)
+        return {"total_count": total_count, "tv_shows": docs}
 
     async def sort_movies(
         self, 
@@ -274,60 +699,307 @@ class Database:
         page: int, 
         page_size: int
     ) -> dict:
-        skip = (page - 1) * page_size
-        sort_criteria = [(field, ASCENDING if direction == "asc" else DESCENDING) 
-                        for field, direction in sort_params]
-        
-        pipeline = [
-            {"$sort": dict(sort_criteria)},
-            {"$facet": {
-                "metadata": [{"$count": "total_count"}],
-                "data": [{"$skip": skip}, {"$limit": page_size}]
-            }}
-        ]
-        
-        result = await self.movie_collection.aggregate(pipeline).to_list(1)
-        total_count = result[0]["metadata"][0]["total_count"] if result[0]["metadata"] else 0
-        sorted_movies = [MovieSchema(**doc) for doc in result[0]["data"]]
-        return {"total_count": total_count, "movies": sorted_movies}
+        total_count, docs = await self._sort_media("movie", sort_params, page, page_size)
+        return {"total_count": total_count, "movies": docs}
 
-    async def find_similar_media(
+    async def filter_media(
         self,
-        tmdb_id: int,
         media_type: str,
-        page: int = 1,
-        page_size: int = 10
+        sort_params: List[Tuple[str, str]],
+        page: int,
+        page_size: int,
+        genres: Optional[List[str]] = None,
+        languages: Optional[List[str]] = None,
+        qualities: Optional[List[str]] = None,
+        rips: Optional[List[str]] = None,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None
     ) -> dict:
-        collection = self.movie_collection if media_type == "movie" else self.tv_collection
-        parent_media = await collection.find_one({"tmdb_id": tmdb_id})
-        
-        if not parent_media:
-            raise HTTPException(status_code=404, detail="Media not found")
-        
-        parent_genres = parent_media.get("genres", [])
-        if not parent_genres:
-            return {"total_count": 0, "similar_media": []}
+        """
+        One page of titles matching every given predicate, plus the catalog-wide
+        facet counts. A title must have all requested genres and any of the
+        requested languages, qualities and rips.
+        """
+        query: dict = {}
+        if genres:
+            query["genres"] = {"$all": genres}
+        if languages:
+            query["languages"] = {"$in": languages}
+        if qualities:
+            query["qualities"] = {"$in": qualities}
+        if rips:
+            query["rip"] = {"$in": rips}
+        if year_from is not None or year_to is not None:
+            query["release_year"] = {
+                op: year for op, year in (("$gte", year_from), ("$lte", year_to)) if year is not None}
 
-        skip = (page - 1) * page_size
+        (total_count, docs), facets = await gather(
+            self._sort_media(media_type, sort_params, page, page_size, query),
+            self.facet_counts(media_type))
+        return {"total_count": total_count, "results": docs, "facets": facets}
+
+    async def changes_since(self, cursor: Optional[ChangeKey], limit: int) -> dict:
+        """
+        Titles added, updated or deleted after `cursor`, oldest first, across
+        every shard. Upserts carry the title summary, deletes only the key.
+        A client that fell further behind than CHANGE_FEED_RETENTION may have
+        missed expired tombstones and is told to start over with `reset`.
+        """
+        now = datetime.utcnow()
+        if cursor and cursor[0] < now - timedelta(seconds=Telegram.CHANGE_FEED_RETENTION):
+            return {"changes": [], "cursor": None, "has_more": True, "reset": True}
+
+        # Writes stamped just before a read may commit just after it; holding
+        # back the newest moment keeps the cursor from skipping past them.
+        query: dict = {"updated_on": {"$lte": now - timedelta(seconds=Telegram.CHANGE_FEED_LAG)}}
+        if cursor:
+            updated_on, tmdb_id, _ = cursor
+            query["$or"] = [
+                {"updated_on": {"$gt": updated_on}},
+                {"updated_on": updated_on, "tmdb_id": {"$gte": tmdb_id}},
+            ]
+        order = [("updated_on", ASCENDING), ("tmdb_id", ASCENDING)]
+        # A movie, a show and a tombstone can share a key; fetch enough to step past them.
+        fetch = limit + 3
+
+        async def read(shard: Shard, media_type: Optional[str]) -> List[dict]:
+            if media_type:
+                docs = await shard.collection(media_type).find(query, SUMMARY_PROJECTION).sort(order).to_list(fetch)
+                return [{"action": "upsert", **doc, "media_type": media_type} for doc in docs]
+            docs = await shard.tombstones.find(
+                query, {"_id": 0, "media_type": 1, "tmdb_id": 1, "updated_on": 1}).sort(order).to_list(fetch)
+            return [{"action": "delete", **doc} for doc in docs]
+
+        results = await gather(*(
+            read(shard, media_type) for shard in self.shards for media_type in ("movie", "tv", None)))
+
+        def key(change: dict) -> ChangeKey:
+            return change["updated_on"], change["tmdb_id"], change["media_type"]
+
+        changes = sorted(
+            (change for docs in results for change in docs if cursor is None or key(change) > cursor),
+            key=lambda change: (key(change), change["action"] == "upsert"))
+        page = changes[:limit]
+        return {
+            "changes": page,
+            "cursor": encode_cursor(key(page[-1])) if page else (encode_cursor(cursor) if cursor else None),
+            "has_more": len(changes) > limit,
+            "reset": False,
+        }
+
+    async def _similar_candidates(
+        self,
+        media_type: str,
+        tmdb_id: int,
+        genres: List[str],
+        limit: Optional[int] = None
+    ) -> List[dict]:
+        """Titles sharing a genre with the parent, best genre overlap and rating first."""
         pipeline = [
             {"$match": {
                 "tmdb_id": {"$ne": tmdb_id},
-                "genres": {"$in": parent_genres}
+                "genres": {"$in": genres}
             }},
-            {"$addFields": {
-                "genreMatchCount": {"$size": {"$setIntersection": ["$genres", parent_genres]}}
+            {"$project": {
+                "_id": 0, "tmdb_id": 1, "rating": 1,
+                "score": {"$size": {"$setIntersection": ["$genres", genres]}}
             }},
-            {"$sort": {"genreMatchCount": -1, "rating": -1}},
-            {"$facet": {
-                "metadata": [{"$count": "total_count"}],
-                "data": [{"$skip": skip}, {"$limit": page_size}]
-            }}
+            {"$sort": {"score": -1, "rating": -1}}
         ]
-        
-        result = await collection.aggregate(pipeline).to_list(1)
-        total_count = result[0]["metadata"][0]["total_count"] if result[0]["metadata"] else 0
-        similar_media = [self._convert_object_id(doc) for doc in result[0]["data"]]
-        return {"total_count": total_count, "similar_media": similar_media}
+        if limit:
+            pipeline.append({"$limit": limit})
+        results = await gather(*(
+            shard.collection(media_type).aggregate(pipeline).to_list(None) for shard in self.shards))
+        candidates = [doc for docs in results for doc in docs]
+        if len(results) > 1:
+            candidates.sort(key=lambda c: (c["score"], _sort_value(c.get("rating"))), reverse=True)
+        return candidates[:limit] if limit else candidates
+
+    async def refresh_similar(self, media_type: str, media: Optional[dict]) -> bool:
+        """
+        Incrementally update the similar index after a title was added or changed.
+        The title gets a fresh neighbour list and is re-ranked into the lists of
+        its SIMILAR_FANOUT * SIMILAR_TOP_K best matches, where it beats their
+        current tail. Nothing happens when its genres and rating are unchanged,
+        which is the common case for a new episode.
+        Returns whether any neighbour list changed.
+        """
+        if not media:
+            return False
+        tmdb_id, genres, rating = media["tmdb_id"], media.get("genres", []), media.get("rating", 0)
+        key = {"media_type": media_type, "tmdb_id": tmdb_id}
+        home = self._shard(tmdb_id)
+
+        current = await home.similar.find_one(key, {"genres": 1, "rating": 1})
+        if current and current.get("genres") == genres and current.get("rating") == rating:
+            return False
+
+        candidates = await self._similar_candidates(
+            media_type, tmdb_id, genres, Telegram.SIMILAR_TOP_K * SIMILAR_FANOUT) if genres else []
+        top_k = candidates[:Telegram.SIMILAR_TOP_K]
+        await home.similar.update_one(key, {"$set": {
+            "genres": genres, "rating": rating, "neighbours": top_k,
+            "count": len(top_k), "updated_on": datetime.utcnow()
+        }}, upsert=True)
+
+        if current:
+            # Drop stale entries first; the genres may no longer overlap at all.
+            await gather(*(
+                shard.similar.update_many(
+                    {"media_type": media_type, "neighbours.tmdb_id": tmdb_id},
+                    [{"$set": {
+                        "neighbours": {"$filter": {
+                            "input": "$neighbours", "cond": {"$ne": ["$$this.tmdb_id", tmdb_id]}}},
+                        "count": {"$subtract": ["$count", 1]}
+                    }}])
+                for shard in self.shards))
+        by_shard: Dict[Shard, List[dict]] = {}
+        for candidate in candidates:
+            by_shard.setdefault(self._shard(candidate["tmdb_id"]), []).append(candidate)
+        for shard, shard_candidates in by_shard.items():
+            tails = {
+                doc["tmdb_id"]: doc
+                async for doc in shard.similar.find(
+                    {"media_type": media_type, "tmdb_id": {"$in": [c["tmdb_id"] for c in shard_candidates]}},
+                    {"_id": 0, "tmdb_id": 1, "count": 1, "neighbours": {"$slice": -1}})
+            }
+            updates, updated = [], []
+            for candidate in shard_candidates:
+                tail = tails.get(candidate["tmdb_id"])
+                # Lists not built yet are left to the rebuild; full lists only
+                # take the title when it outranks their last neighbour.
+                if tail is None:
+                    continue
+                if tail.get("count", 0) >= Telegram.SIMILAR_TOP_K and tail["neighbours"]:
+                    last = tail["neighbours"][-1]
+                    if (candidate["score"], _sort_value(rating)) <= (last["score"], _sort_value(last.get("rating"))):
+                        continue
+                updates.append(UpdateOne(
+                    {"media_type": media_type, "tmdb_id": candidate["tmdb_id"]},
+                    {"$push": {"neighbours": {
+                        "$each": [{"tmdb_id": tmdb_id, "rating": rating, "score": candidate["score"]}],
+                        "$sort": {"score": -1, "rating": -1},
+                        "$slice": Telegram.SIMILAR_TOP_K
+                    }}}
+                ))
+                updated.append(candidate["tmdb_id"])
+            if updates:
+                await shard.similar.bulk_write(updates, ordered=False)
+                await shard.similar.update_many(
+                    {"media_type": media_type, "tmdb_id": {"$in": updated}},
+                    [{"$set": {"count": {"$size": "$neighbours"}}}])
+        return True
+
+    def schedule_similar(self, media_type: str, tmdb_id: int) -> None:
+        """Queue a title for refresh_similar; ingest does not wait for the fan-out."""
+        key = (media_type, tmdb_id)
+        if key not in self._similar_pending:
+            self._similar_pending.add(key)
+            self._similar_queue.put_nowait(key)
+
+    async def run_similar_updates(self) -> None:
+        """Background task: work off the titles queued by schedule_similar."""
+        while True:
+            key = await self._similar_queue.get()
+            self._similar_pending.discard(key)
+            media_type, tmdb_id = key
+            try:
+                _, media = await self._find_existing(
+                    media_type, {"tmdb_id": tmdb_id}, {"tmdb_id": 1, "genres": 1, "rating": 1})
+                if await self.refresh_similar(media_type, media):
+                    await self._notify("upsert", media_type, tmdb_id, similar_changed=True)
+            except Exception as e:
+                LOGGER.error(f"Error refreshing similar index for {tmdb_id}: {e}")
+
+    async def rebuild_similar(self) -> None:
+        """
+        Recompute the neighbour list of every title from scratch. Genres and
+        ratings are read once and ranked in memory, instead of one
+        aggregation over the collection per title.
+        """
+        for media_type in ("movie", "tv"):
+            titles: Dict[int, dict] = {}
+            for shard in self.shards:
+                async for media in shard.collection(media_type).find(
+                        {}, {"_id": 0, "tmdb_id": 1, "genres": 1, "rating": 1}):
+                    titles[media["tmdb_id"]] = media
+            by_genre: Dict[str, List[int]] = {}
+            for tmdb_id, media in titles.items():
+                for genre in media.get("genres") or ():
+                    by_genre.setdefault(genre, []).append(tmdb_id)
+
+            writes: Dict[Shard, List[UpdateOne]] = {}
+            now = datetime.utcnow()
+            for built, (tmdb_id, media) in enumerate(titles.items(), 1):
+                scores: Dict[int, int] = {}
+                for genre in set(media.get("genres") or ()):
+                    for other in by_genre[genre]:
+                        if other != tmdb_id:
+                            scores[other] = scores.get(other, 0) + 1
+                ranked = nlargest(Telegram.SIMILAR_TOP_K, scores,
+                                  key=lambda i: (scores[i], _sort_value(titles[i].get("rating"))))
+                neighbours = [
+                    {"tmdb_id": i, "rating": titles[i].get("rating"), "score": scores[i]} for i in ranked]
+                shard = self._shard(tmdb_id)
+                writes.setdefault(shard, []).append(UpdateOne(
+                    {"media_type": media_type, "tmdb_id": tmdb_id},
+                    {"$set": {
+                        "genres": media.get("genres", []), "rating": media.get("rating", 0),
+                        "neighbours": neighbours, "count": len(neighbours), "updated_on": now
+                    }}, upsert=True))
+                if len(writes[shard]) >= SIMILAR_WRITE_BATCH:
+                    await shard.similar.bulk_write(writes.pop(shard), ordered=False)
+                if built % SIMILAR_WRITE_BATCH == 0:
+                    await asleep(0)
+            for shard, batch in writes.items():
+                await shard.similar.bulk_write(batch, ordered=False)
+            LOGGER.info(f"Similar index rebuilt for {len(titles)} {media_type} titles")
+
+    async def run_similar_rebuilds(self) -> None:
+        """
+        Background task: keep the similar index fresh, correcting drift from
+        deletions. An index left by a previous run is not rebuilt at startup.
+        """
+        if any(await gather(*(shard.similar.find_one({}, {"_id": 1}) for shard in self.shards))):
+            await asleep(Telegram.SIMILAR_REBUILD_INTERVAL)
+        while True:
+            try:
+                await self.rebuild_similar()
+            except Exception as e:
+                LOGGER.error(f"Error rebuilding similar index: {e}")
+            await asleep(Telegram.SIMILAR_REBUILD_INTERVAL)
+
+    async def find_similar_media(
+        self,
+        tmdb_id: int,
+        media_type: str,
+        page: int = 1,
+        page_size: int = 10
+    ) -> dict:
+        media_type = "movie" if media_type == "movie" else "tv"
+        shard = self._shard(tmdb_id)
+        skip = (page - 1) * page_size
+
+        entry = await shard.similar.find_one(
+            {"media_type": media_type, "tmdb_id": tmdb_id},
+            {"_id": 0, "count": 1, "neighbours": {"$slice": [skip, page_size]}}
+        )
+        if entry is None:
+            # Not indexed yet (e.g. before the first background build).
+            parent_media = await shard.collection(media_type).find_one({"tmdb_id": tmdb_id}, {"genres": 1})
+            if not parent_media:
+                _, parent_media = await self._find_existing(media_type, {"tmdb_id": tmdb_id}, {"genres": 1})
+            if not parent_media:
+                raise HTTPException(status_code=404, detail="Media not found")
+            parent_genres = parent_media.get("genres", [])
+            if not parent_genres:
+                return {"total_count": 0, "similar_media": []}
+            candidates = await self._similar_candidates(
+                media_type, tmdb_id, parent_genres, Telegram.SIMILAR_TOP_K)
+            entry = {"count": len(candidates), "neighbours": candidates[skip:skip + page_size]}
+
+        similar_media = await self.summaries_for(media_type, [n["tmdb_id"] for n in entry["neighbours"]])
+        return {"total_count": entry["count"], "similar_media": similar_media}
 
     async def search_documents(
         self, 
@@ -339,37 +1011,25 @@ class Database:
         words = query.split()
         regex_query = {'$regex': '.*' + '.*'.join(words) + '.*', '$options': 'i'}
         
-        tv_pipeline = [
-            {"$match": {"$or": [
-                {"title": regex_query},
-                {"seasons.episodes.telegram.name": regex_query}
-            ]}},
-            {"$project": {
-                "_id": 1, "tmdb_id": 1, "title": 1, "genres": 1, "rating": 1,
-                "release_year": 1, "poster": 1, "backdrop": 1, "description": 1,
-                "total_seasons": 1, "total_episodes": 1, "media_type": 1
-            }}
-        ]
-        
-        movie_pipeline = [
-            {"$match": {"$or": [
-                {"title": regex_query},
-                {"telegram.name": regex_query}
-            ]}},
-            {"$project": {
-                "_id": 1, "tmdb_id": 1, "title": 1, "genres": 1, "rating": 1,
-                "release_year": 1, "poster": 1, "backdrop": 1, "description": 1,
-                "media_type": 1
-            }}
-        ]
-        
-        tv_results = await self.tv_collection.aggregate(tv_pipeline).to_list(None)
-        movie_results = await self.movie_collection.aggregate(movie_pipeline).to_list(None)
-        combined = tv_results + movie_results
+        async def search_shard(shard: Shard, media_type: str) -> List[dict]:
+            file_ids = await shard.files.distinct(
+                "tmdb_id", {"media_type": media_type, "name": regex_query})
+            pipeline = [
+                {"$match": {"$or": [
+                    {"title": regex_query},
+                    {"tmdb_id": {"$in": file_ids}}
+                ]}},
+                {"$project": SUMMARY_PROJECTION}
+            ]
+            return await shard.collection(media_type).aggregate(pipeline).to_list(None)
+
+        tv_results = await gather(*(search_shard(shard, "tv") for shard in self.shards))
+        movie_results = await gather(*(search_shard(shard, "movie") for shard in self.shards))
+        combined = [doc for docs in tv_results + movie_results for doc in docs]
         
         return {
             "total_count": len(combined),
-            "results": [self._convert_object_id(doc) for doc in combined[skip:skip+page_size]]
+            "results": combined[skip:skip+page_size]
         }
 
     async def get_media_details(
@@ -377,56 +1037,166 @@ class Database:
         tmdb_id: int,
         season_number: Optional[int] = None,
         episode_number: Optional[int] = None
+    ) -> Optional[dict]:
+        details = await self._media_details_on(self._shard(tmdb_id), tmdb_id, season_number, episode_number)
+        if details is None:
+            for media_type in ("tv",) if season_number is not None else ("tv", "movie"):
+                shard = await self._stored_shard(media_type, tmdb_id)
+                if shard is not None:
+                    return await self._media_details_on(shard, tmdb_id, season_number, episode_number)
+        return details
+
+    async def _media_details_on(
+        self,
+        shard: Shard,
+        tmdb_id: int,
+        season_number: Optional[int],
+        episode_number: Optional[int]
     ) -> Optional[dict]:
         if episode_number is not None and season_number is not None:
-            tv_show = await self.tv_collection.find_one({"tmdb_id": tmdb_id})
-            if not tv_show:
+            # Only the matching episode leaves the server, not the whole show.
+            pipeline = [
+                {"$match": {"tmdb_id": tmdb_id}},
+                {"$project": {"_id": 0, "season": {"$arrayElemAt": [{"$filter": {
+                    "input": "$seasons", "as": "s",
+                    "cond": {"$eq": ["$$s.season_number", season_number]}
+                }}, 0]}}},
+                {"$project": {"episode": {"$arrayElemAt": [{"$filter": {
+                    "input": "$season.episodes", "as": "e",
+                    "cond": {"$eq": ["$$e.episode_number", episode_number]}
+                }}, 0]}}}
+            ]
+            result, files = await gather(
+                shard.tv.aggregate(pipeline).to_list(1),
+                self._files_for(shard, tmdb_id, "tv", season_number, episode_number)
+            )
+            episode = result[0].get("episode") if result else None
+            if not episode:
                 return None
-            for season in tv_show.get("seasons", []):
-                if season.get("season_number") == season_number:
-                    for episode in season.get("episodes", []):
-                        if episode.get("episode_number") == episode_number:
-                            details = self._convert_object_id(episode)
-                            details.update({
-                                "tmdb_id": tmdb_id,
-                                "type": "tv",
-                                "season_number": season_number,
-                                "episode_number": episode_number,
-                                "backdrop": episode.get("episode_backdrop")
-                            })
-                            return details
-            return None
+            self._attach_tv_files([{"season_number": season_number, "episodes": [episode]}], files)
+            episode.update({
+                "tmdb_id": tmdb_id,
+                "type": "tv",
+                "season_number": season_number,
+                "episode_number": episode_number,
+                "backdrop": episode.get("episode_backdrop")
+            })
+            return episode
 
         elif season_number is not None:
-            tv_show = await self.tv_collection.find_one({"tmdb_id": tmdb_id})
-            if not tv_show:
+            tv_show, files = await gather(
+                shard.tv.find_one(
+                    {"tmdb_id": tmdb_id},
+                    {"_id": 0, "seasons": {"$elemMatch": {"season_number": season_number}}}
+                ),
+                self._files_for(shard, tmdb_id, "tv", season_number)
+            )
+            if not tv_show or not tv_show.get("seasons"):
                 return None
-            for season in tv_show.get("seasons", []):
-                if season.get("season_number") == season_number:
-                    details = self._convert_object_id(season)
-                    details.update({
-                        "tmdb_id": tmdb_id,
-                        "type": "tv",
-                        "season_number": season_number
-                    })
-                    return details
-            return None
+            season = tv_show["seasons"][0]
+            self._attach_tv_files([season], files)
+            season.update({
+                "tmdb_id": tmdb_id,
+                "type": "tv",
+                "season_number": season_number
+            })
+            return season
 
         else:
-            tv_doc = await self.tv_collection.find_one({"tmdb_id": tmdb_id})
+            # Resolve TV-or-movie in one round trip instead of two sequential lookups.
+            tv_doc, movie_doc, tv_files, movie_files = await gather(
+                shard.tv.find_one({"tmdb_id": tmdb_id}),
+                shard.movie.find_one({"tmdb_id": tmdb_id}),
+                self._files_for(shard, tmdb_id, "tv"),
+                self._files_for(shard, tmdb_id, "movie")
+            )
             if tv_doc:
-                tv_doc = self._convert_object_id(tv_doc)
-                tv_doc["type"] = "tv"
-                return tv_doc
-            
-            movie_doc = await self.movie_collection.find_one({"tmdb_id": tmdb_id})
+                return self._tv_details(tv_doc, tv_files)
             if movie_doc:
-                movie_doc = self._convert_object_id(movie_doc)
-                movie_doc["type"] = "movie"
-                return movie_doc
-            
+                return self._movie_details(movie_doc, movie_files)
             return None
 
+    def _tv_details(self, tv_doc: dict, files: List[dict]) -> dict:
+        self._attach_tv_files(tv_doc.get("seasons", []), files)
+        tv_doc = self._convert_object_id(tv_doc)
+        tv_doc["type"] = "tv"
+        return tv_doc
+
+    def _movie_details(self, movie_doc: dict, files: List[dict]) -> dict:
+        movie_doc["telegram"] = [
+            {"quality": f["quality"], "id": f["id"], "name": f["name"], "size": f["size"]}
+            for f in files
+        ]
+        movie_doc = self._convert_object_id(movie_doc)
+        movie_doc["type"] = "movie"
+        return movie_doc
+
+    async def get_media_details_batch(self, items: List[dict]) -> List[Optional[dict]]:
+        """
+        get_media_details for many titles at once. Each item is a dict with
+        tmdb_id and optional season_number/episode_number; results come back
+        in the same order, None where nothing matched. Every shard involved
+        answers one $in query per collection; titles missing from their home
+        shard are looked for on all of them in one more round.
+        """
+        by_shard: Dict[Shard, List[int]] = {}
+        for item in items:
+            ids = by_shard.setdefault(self._shard(item["tmdb_id"]), [])
+            if item["tmdb_id"] not in ids:
+                ids.append(item["tmdb_id"])
+
+        async def fetch(shard: Shard, ids: List[int]):
+            query = {"tmdb_id": {"$in": ids}}
+            return await gather(
+                shard.tv.find(query).to_list(None),
+                shard.movie.find(query).to_list(None),
+                shard.files.find(query, {**FILE_PROJECTION, "tmdb_id": 1, "media_type": 1}).to_list(None))
+
+        tv_docs: Dict[int, dict] = {}
+        movie_docs: Dict[int, dict] = {}
+        files: Dict[Tuple[str, int], List[dict]] = {}
+
+        def collect(fetched) -> None:
+            for tv, movies, rows in fetched:
+                tv_docs.update((doc["tmdb_id"], doc) for doc in tv)
+                movie_docs.update((doc["tmdb_id"], doc) for doc in movies)
+                for row in rows:
+                    files.setdefault((row["media_type"], row["tmdb_id"]), []).append(row)
+
+        collect(await gather(*(fetch(shard, ids) for shard, ids in by_shard.items())))
+        missing = [i for ids in by_shard.values() for i in ids if i not in tv_docs and i not in movie_docs]
+        if missing and len(self.shards) > 1:
+            # Not yet rebalanced; home had neither the title nor its files.
+            collect(await gather(*(fetch(shard, missing) for shard in self.shards)))
+        # Files go onto every episode once; the per-item shapes below are cut from that.
+        tv_details = {
+            tmdb_id: self._tv_details(doc, files.get(("tv", tmdb_id), [])) for tmdb_id, doc in tv_docs.items()}
+
+        def resolve(item: dict) -> Optional[dict]:
+            tmdb_id = item["tmdb_id"]
+            season_number, episode_number = item.get("season_number"), item.get("episode_number")
+            if season_number is None:
+                if tmdb_id in tv_details:
+                    return tv_details[tmdb_id]
+                if tmdb_id in movie_docs:
+                    return self._movie_details(movie_docs[tmdb_id], files.get(("movie", tmdb_id), []))
+                return None
+            show = tv_details.get(tmdb_id)
+            season = next((s for s in (show or {}).get("seasons", [])
+                           if s["season_number"] == season_number), None)
+            if season is None:
+                return None
+            if episode_number is None:
+                return {**season, "tmdb_id": tmdb_id, "type": "tv", "season_number": season_number}
+            episode = next((e for e in season.get("episodes", [])
+                            if e["episode_number"] == episode_number), None)
+            if episode is None:
+                return None
+            return {**episode, "tmdb_id": tmdb_id, "type": "tv", "season_number": season_number,
+                    "episode_number": episode_number, "backdrop": episode.get("episode_backdrop")}
+
+        return [resolve(item) for item in items]
+
     async def get_quality_details(
         self,
         tmdb_id: int,
@@ -434,58 +1204,82 @@ class Database:
         season: Optional[int] = None,
         episode: Optional[int] = None
     ) -> List[Dict[str, int]]:
-        if season is None:
-            # Movie case
-            doc = await self.movie_collection.find_one(
-                {"tmdb_id": tmdb_id},
-                {"telegram": 1}
-            )
-            if not doc:
-                return []
-            return [
-                {"id": item["id"], "name": item["name"]}
-                for item in doc.get("telegram", [])
-                if item["quality"] == quality
-            ]
-        else:
-            # TV show case
-            doc = await self.tv_collection.find_one(
-                {"tmdb_id": tmdb_id},
-                {"seasons": 1}
-            )
-            if not doc:
-                return []
-            
-            results = []
-            for s in doc.get("seasons", []):
-                if s["season_number"] == season:
-                    episodes = s.get("episodes", [])
-                    
-                    # Filter by specific episode if provided
-                    if episode is not None:
-                        episodes = [ep for ep in episodes if ep["episode_number"] == episode]
-                    
-                    for ep in episodes:
-                        results.extend([
-                            {"id": t["id"], "name": t["name"]}
-                            for t in ep.get("telegram", [])
-                            if t["quality"] == quality
-                        ])
-            return results
+        query = {
+            "tmdb_id": tmdb_id,
+            "media_type": "movie" if season is None else "tv",
+            "quality": quality
+        }
+        if season is not None:
+            query["season_number"] = season
+            # Filter by specific episode if provided
+            if episode is not None:
+                query["episode_number"] = episode
 
+        shard = self._shard(tmdb_id)
+        results = await shard.files.find(query, {"_id": 0, "id": 1, "name": 1}).sort(
+            "episode_number", ASCENDING).to_list(None)
+        if not results:
+            stored = await self._stored_shard(query["media_type"], tmdb_id)
+            if stored is not None:
+                results = await stored.files.find(query, {"_id": 0, "id": 1, "name": 1}).sort(
+                    "episode_number", ASCENDING).to_list(None)
+        return results
+
+
+    async def retire_provisional(
+        self,
+        media_type: str,
+        tmdb_id: int,
+        season_number: Optional[int],
+        episode_number: Optional[int],
+        quality: str
+    ) -> None:
+        """
+        Drop one file from a placeholder title once it has been catalogued
+        under its real id. The episode goes with its last file and the
+        placeholder with its last episode.
+        """
+        shard = await self._stored_shard(media_type, tmdb_id) or self._shard(tmdb_id)
+        key = {"tmdb_id": tmdb_id, "media_type": media_type}
+        await shard.files.delete_one(
+            {**key, "season_number": season_number, "episode_number": episode_number, "quality": quality})
+        if not await shard.files.count_documents(key, limit=1):
+            await self.delete_document("mov" if media_type == "movie" else "tv", tmdb_id)
+            return
+        if media_type == "tv" and not await shard.files.count_documents(
+                {**key, "season_number": season_number, "episode_number": episode_number}, limit=1):
+            await shard.tv.update_one(
+                {"tmdb_id": tmdb_id, "seasons.season_number": season_number},
+                {"$pull": {"seasons.$.episodes": {"episode_number": episode_number}},
+                 "$set": {"updated_on": datetime.utcnow()}})
+            await self._notify("upsert", media_type, tmdb_id,
+                               season_number=season_number, episode_number=episode_number)
 
     async def delete_document(
         self,
         media_type: str,
         tmdb_id: int
     ) -> bool:
-        if media_type == "mov":
-            result = await self.movie_collection.delete_one({"tmdb_id": tmdb_id})
-        else:
-            result = await self.tv_collection.delete_one({"tmdb_id": tmdb_id})
+        catalog_type = "movie" if media_type == "mov" else "tv"
+        shard = await self._stored_shard(catalog_type, tmdb_id) or self._shard(tmdb_id)
+        deleted = await shard.collection(catalog_type).find_one_and_delete({"tmdb_id": tmdb_id})
+        if deleted:
+            await self._update_facets(catalog_type, await self._with_qualities(catalog_type, deleted, shard), None)
+        # File rows and the similar entry may sit on either shard until rebalance has run.
+        key = {"tmdb_id": tmdb_id, "media_type": catalog_type}
+        await gather(*(other.files.delete_many(key) for other in self.shards))
+        await gather(*(other.similar.delete_one(key) for other in self.shards))
+        await gather(*(
+            other.similar.update_many(
+                {"media_type": catalog_type, "neighbours.tmdb_id": tmdb_id},
+                {"$pull": {"neighbours": {"tmdb_id": tmdb_id}}, "$inc": {"count": -1}})
+            for other in self.shards))
         
-        if result.deleted_count > 0:
+        if deleted:
+            await self._shard(tmdb_id).tombstones.insert_one(
+                {"media_type": catalog_type, "tmdb_id": tmdb_id, "updated_on": datetime.utcnow()})
             LOGGER.info(f"{media_type} with tmdb_id {tmdb_id} deleted successfully.")
+            await self._notify("delete", catalog_type, tmdb_id, similar_changed=True)
             return True
         LOGGER.info(f"No document found with tmdb_id {tmdb_id}.")
         return False
\ No newline at end of file
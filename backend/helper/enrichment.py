@@ -0,0 +1,171 @@
+import random
+from asyncio import Lock, Queue, create_task, sleep as asleep
+from datetime import datetime, timedelta
+from typing import List, Set
+
+from backend import db
+from backend.config import Telegram
+from backend.helper.known_files import known_files
+from backend.helper.metadata import metadata
+from backend.logger import LOGGER
+
+
+# update_tv_show / update_movie read, merge and replace a whole title, so
+# catalog writes must not interleave.
+catalog_lock = Lock()
+
+
+class Enricher:
+    """
+    Second phase of ingestion. A new file is catalogued at once under a
+    placeholder built from its name (see provisional_metadata) and gets a
+    job in the `enrichment` collection. ENRICH_WORKERS tasks work the jobs
+    off: resolve the real metadata, catalogue the file under it and retire
+    the placeholder copy.
+
+    A failed lookup is retried after ENRICH_RETRY_BACKOFF seconds, doubling
+    each time. After ENRICH_MAX_ATTEMPTS the job moves to `enrichment_dead`
+    and the placeholder stays listed until the job is retried by hand.
+    Jobs live in MongoDB, so a restart resumes where it stopped.
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self.enriched = 0
+        self.retried = 0
+        self.dead = 0
+        self._queue: Queue = Queue()
+        self._workers: List = []
+        # Scheduled retries; the loop only keeps weak references to tasks.
+        self._retries: Set = set()
+
+    @property
+    def _jobs(self):
+        return self.database.db["enrichment"]
+
+    @property
+    def _dead_letters(self):
+        return self.database.db["enrichment_dead"]
+
+    async def submit(self, filename: str, placeholder: dict, hash: str, channel: int,
+                     msg_id: int, size: str, name: str) -> None:
+        """Queue a file catalogued under `placeholder` for its real metadata."""
+        job = {
+            "_id": f"{channel}:{msg_id}",
+            "filename": filename,
+            "media_type": placeholder["media_type"],
+            "tmdb_id": placeholder["tmdb_id"],
+            "season_number": placeholder.get("season_number"),
+            "episode_number": placeholder.get("episode_number"),
+            "quality": placeholder["quality"],
+            "hash": hash,
+            "channel": channel,
+            "msg_id": msg_id,
+            "size": size,
+            "name": name,
+            "attempts": 0,
+            "next_attempt": datetime.utcnow(),
+        }
+        await self._jobs.replace_one({"_id": job["_id"]}, job, upsert=True)
+        self._queue.put_nowait(job)
+
+    async def _later(self, job: dict, delay: float) -> None:
+        await asleep(delay)
+        self._queue.put_nowait(job)
+
+    def _schedule(self, job: dict, delay: float) -> None:
+        task = create_task(self._later(job, delay))
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    async def _fail(self, job: dict, error: str) -> None:
+        job["attempts"] += 1
+        job["last_error"] = error
+        if job["attempts"] >= Telegram.ENRICH_MAX_ATTEMPTS:
+            self.dead += 1
+            LOGGER.warning(f"Giving up on metadata for {job['filename']} after {job['attempts']} attempts: {error}")
+            await self._dead_letters.replace_one(
+                {"_id": job["_id"]}, {**job, "failed_on": datetime.utcnow()}, upsert=True)
+            await self._jobs.delete_one({"_id": job["_id"]})
+            return
+
+        self.retried += 1
+        delay = Telegram.ENRICH_RETRY_BACKOFF * 2 ** (job["attempts"] - 1)
+        # Jittered so the episodes of a failed season pack do not retry in lockstep.
+        delay = random.uniform(delay / 2, delay)
+        job["next_attempt"] = datetime.utcnow() + timedelta(seconds=delay)
+        await self._jobs.replace_one({"_id": job["_id"]}, job)
+        self._schedule(job, delay)
+
+    async def _enrich(self, job: dict) -> None:
+        info = await metadata(job["filename"], None)
+        if info is None:
+            return await self._fail(job, "no metadata found")
+
+        async with catalog_lock:
+            doc_id = await self.database.insert_media(
+                info, hash=job["hash"], channel=job["channel"], msg_id=job["msg_id"],
+                size=job["size"], name=job["name"])
+            if doc_id is None:
+                return await self._fail(job, "catalog write failed")
+            # Before the placeholder goes, or its delete would forget the post.
+            await known_files.add(job["channel"], job["msg_id"], info["media_type"], info["tmdb_id"])
+            await self.database.retire_provisional(
+                job["media_type"], job["tmdb_id"], job["season_number"],
+                job["episode_number"], job["quality"])
+
+        await self._jobs.delete_one({"_id": job["_id"]})
+        self.enriched += 1
+        LOGGER.info(f"Enriched {job['filename']} as {info['media_type']} {info['tmdb_id']}")
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._enrich(job)
+            except Exception as e:
+                LOGGER.error(f"Error enriching {job['filename']}: {e}")
+                try:
+                    await self._fail(job, str(e))
+                except Exception as e:
+                    LOGGER.error(f"Error rescheduling {job['filename']}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def start(self) -> None:
+        """Reload unfinished jobs and start the workers. Called once after db.connect()."""
+        now = datetime.utcnow()
+        pending = 0
+        async for job in self._jobs.find({}):
+            delay = (job["next_attempt"] - now).total_seconds()
+            if delay > 0:
+                self._schedule(job, delay)
+            else:
+                self._queue.put_nowait(job)
+            pending += 1
+        if pending:
+            LOGGER.info(f"Resuming metadata enrichment for {pending} files")
+        self._workers = [create_task(self._work()) for _ in range(Telegram.ENRICH_WORKERS)]
+
+    async def drain(self) -> None:
+        """Wait until every queued job has been tried once; scheduled retries are not waited for."""
+        await self._queue.join()
+
+    async def retry_dead(self) -> int:
+        """Move every dead-lettered job back to the queue; returns how many."""
+        count = 0
+        async for job in self._dead_letters.find({}):
+            job.pop("failed_on", None)
+            job.update(attempts=0, next_attempt=datetime.utcnow())
+            await self._jobs.replace_one({"_id": job["_id"]}, job, upsert=True)
+            await self._dead_letters.delete_one({"_id": job["_id"]})
+            self._queue.put_nowait(job)
+            count += 1
+        return count
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "enriched": self.enriched,
+                "retried": self.retried, "dead": self.dead}
+
+
+enricher = Enricher(db)
@@ -0,0 +1,114 @@
+from asyncio import Queue, QueueEmpty, QueueFull, wait_for, TimeoutError as AsyncTimeoutError
+from itertools import count
+from typing import AsyncIterator, Set
+
+import orjson
+
+from backend.config import Telegram
+from backend.logger import LOGGER
+
+
+# Sent in place of the events a slow subscriber missed; the client should
+# catch up through /api/changes.
+RESYNC = b"event: resync\ndata: {}\n\n"
+HEARTBEAT = b": keep-alive\n\n"
+
+# Fields of a catalog event worth pushing to browsers.
+EVENT_FIELDS = ("action", "media_type", "tmdb_id", "season_number", "episode_number", "quality")
+
+
+class Subscription:
+    """A bounded queue of encoded frames for one connected client."""
+
+    def __init__(self, size: int):
+        # Room for at least a resync marker and the newest frame.
+        self.queue: "Queue[bytes]" = Queue(maxsize=max(size, 2))
+        self.dropped = 0
+
+    def push(self, frame: bytes) -> None:
+        try:
+            self.queue.put_nowait(frame)
+        except QueueFull:
+            # Drop the oldest frames instead of buffering without bound, and
+            # tell the client it has a gap to fill.
+            self.dropped += 1
+            while self.queue.qsize() > self.queue.maxsize - 2:
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            self.queue.put_nowait(frame)
+
+    def drain(self) -> None:
+        while True:
+            try:
+                self.queue.get_nowait()
+            except QueueEmpty:
+                return
+
+
+class EventHub:
+    """
+    Fans catalog events out to Server-Sent Event subscribers. Each event is
+    encoded once and handed to every subscriber's bounded queue, so a stalled
+    client costs at most `queue_size` frames and never slows the writer.
+    """
+
+    def __init__(self, queue_size: int, max_subscribers: int, heartbeat: int):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.heartbeat = heartbeat
+        self.published = 0
+        self._ids = count(1)
+        self._subscribers: Set[Subscription] = set()
+
+    def full(self) -> bool:
+        return len(self._subscribers) >= self.max_subscribers
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.queue_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+        subscription.drain()
+
+    def publish(self, event: dict) -> None:
+        payload = {field: event[field] for field in EVENT_FIELDS if event.get(field) is not None}
+        frame = b"id: %d\nevent: title\ndata: %s\n\n" % (next(self._ids), orjson.dumps(payload))
+        self.published += 1
+        for subscription in self._subscribers:
+            subscription.push(frame)
+
+    def on_catalog_change(self, event: dict) -> None:
+        """Database listener."""
+        try:
+            self.publish(event)
+        except Exception as e:
+            LOGGER.error(f"Error publishing catalog event: {e}")
+
+    async def stream(self, subscription: Subscription, disconnected) -> AsyncIterator[bytes]:
+        """Frames for one client until `disconnected()` reports it has gone."""
+        try:
+            yield b"retry: 5000\n\n"
+            while not await disconnected():
+                try:
+                    yield await wait_for(subscription.queue.get(), timeout=self.heartbeat)
+                except AsyncTimeoutError:
+                    yield HEARTBEAT
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped": sum(s.dropped for s in self._subscribers),
+        }
+
+
+def create_hub() -> EventHub:
+    return EventHub(
+        queue_size=Telegram.EVENTS_QUEUE_SIZE,
+        max_subscribers=Telegram.EVENTS_MAX_SUBSCRIBERS,
+        heartbeat=Telegram.EVENTS_HEARTBEAT,
+    )
@@ -0,0 +1,246 @@
+"""
+Filename classification: cleaning, URL stripping, PTN parsing and language
+detection and normalisation for every ingested file.
+
+Patterns are compiled once at import. Languages are looked up in a table
+built once from pycountry. A name is split at its resolution token: a plain
+head (title, year, SxxEyy) is read with compiled patterns, and the release
+tags after it (source, codec, audio, languages, group) go through PTN,
+memoized per tag string, so releases by the same group cost one PTN call
+between them. Names with any other head go through PTN whole, memoized per
+season pack: the SxxEyy token is canonicalised before parsing and the real
+episode put back afterwards.
+
+This module imports nothing from the bot or the database, so it can be
+loaded on its own (see benchmarks/filename_parsing.py).
+"""
+import re
+from functools import lru_cache
+from typing import Dict, List, Union
+
+import PTN
+import pycountry
+
+from backend.logger import LOGGER
+
+
+# Channel tags such as "@Channel_", "_@Channel_" or "[@Channel]".
+_MENTIONS = re.compile(r'_@[A-Za-z]+_|@[A-Za-z]+_|[\[\]\s@]*@[^.\s\[\]]+[\]\[\s@]*')
+# Audio, network and bitrate tokens that confuse PTN's title detection.
+_NOISE = re.compile(
+    r'(?<=\W)(org|AMZN|DDP|DD|NF|AAC|TVDL|5\.1|2\.1|2\.0|7\.0|7\.1|5\.0|~|\b\w+kbps\b)(?=\W)',
+    re.IGNORECASE)
+_SPACES = re.compile(r'\s+')
+_URLS = re.compile(r'\b(?:https?|ftp):\/\/[^\s/$.?#].[^\s]*')
+# A single plain SxxEyy token; ranges and multi-episode tokens (S01E01-E02,
+# S01E01E02) are parsed as they are.
+_EPISODE = re.compile(r'(?<![A-Za-z0-9])([Ss]\d{1,2}[Ee])(\d{1,3})(?![\dEe-])')
+_CANONICAL_EPISODE = "01"
+_RESOLUTION = re.compile(r'\b\d{3,4}[pP]\b')
+_WORDS = re.compile(r'[A-Za-z]+')
+
+PARSE_CACHE_SIZE = 8192
+
+
+def clean_filename(filename: str) -> str:
+    cleaned = _MENTIONS.sub('', filename)
+    cleaned = _NOISE.sub('', cleaned)
+    return _SPACES.sub(' ', cleaned).strip().replace(' .', '.')
+
+
+def remove_urls(text: str) -> str:
+    return _SPACES.sub(' ', _URLS.sub('', text)).strip()
+
+
+@lru_cache(maxsize=1)
+def language_table() -> Dict[str, str]:
+    """Lower-cased ISO 639 language name -> ISO 639-1 code, for every language that has one."""
+    table = {}
+    for language in pycountry.languages:
+        code = getattr(language, "alpha_2", None)
+        if not code:
+            continue
+        for field in ("name", "common_name", "inverted_name"):
+            name = getattr(language, field, None)
+            if name:
+                table.setdefault(name.lower(), code)
+    return table
+
+
+def normalize_languages(language: Union[str, List[str], None]) -> List[str]:
+    """Normalize the language input(s) to a list of ISO 639-1 codes."""
+    if not language:
+        return []
+    if isinstance(language, str):
+        language = [language]
+
+    table = language_table()
+    normalized = []
+    for lang in language:
+        code = table.get(lang.lower()) if isinstance(lang, str) else None
+        if code:
+            normalized.append(code)
+        else:
+            LOGGER.debug(f"Language '{lang}' not found or does not have an ISO 639-1 code.")
+    return normalized
+
+
+def _trailing_languages(filename: str) -> List[str]:
+    """
+    Language names among the release tags after the resolution, where PTN
+    misses them when they run into the extension ("...WEB-DL.Tamil.Hindi.mkv").
+    Words before the resolution are the title and are left alone.
+    """
+    match = _RESOLUTION.search(filename)
+    if not match:
+        return []
+    table = language_table()
+    found = []
+    for word in _WORDS.findall(filename[match.end():]):
+        if word.lower() in table and word not in found:
+            found.append(word)
+    return found
+
+
+# The part of a name before its resolution, when it is a plain
+# "Title SxxEyy [Episode Name]" or "Title Year"; anything else goes to PTN
+# whole. A year right before SxxEyy is read as the year, like PTN does.
+_HEAD_EPISODE = re.compile(
+    r'^(?P<title>.+?)[\s._(\[-]+(?:\(?(?P<year>(?:19|20)\d{2})\)?[\s._-]+)?'
+    r'[Ss](?P<season>\d{1,2})[Ee](?P<episode>\d{1,3})(?![\dEe-])(?P<rest>.*)$')
+_HEAD_MOVIE = re.compile(r'^(?P<title>.+?)[\s._(\[-]+\(?(?P<year>(?:19|20)\d{2})\)?(?!\d)(?P<rest>[^\d]*)$')
+_TITLE_SEPARATORS = re.compile(r'[\s._]+')
+
+
+def _parse_head(head: str):
+    """
+    Title, year, season, episode and languages of a plain head; None when
+    PTN must parse the name. Other words after SxxEyy are the episode name,
+    as PTN reads them; after a movie's year they are release tags PTN only
+    recognises in context (Extended, IMAX, ...), so those names go to PTN whole.
+    """
+    match = _HEAD_EPISODE.match(head) or _HEAD_MOVIE.match(head)
+    if not match:
+        return None
+    title = _TITLE_SEPARATORS.sub(' ', match.group("title")).strip(" -([")
+    if not title:
+        return None
+    parsed = {"title": title}
+    if match.group("year"):
+        parsed["year"] = int(match.group("year"))
+    if "season" in match.groupdict():
+        parsed["season"] = int(match.group("season"))
+        parsed["episode"] = int(match.group("episode"))
+    table = language_table()
+    words = _WORDS.findall(match.group("rest"))
+    languages = [word for word in words if word.lower() in table]
+    leftover = [word for word in words if word.lower() not in table]
+    if leftover and "season" not in parsed:
+        return None
+    if leftover:
+        parsed["episodeName"] = " ".join(leftover)
+    if languages:
+        parsed["language"] = languages
+    return parsed
+
+
+def _parse_tags(tags: str) -> dict:
+    """
+    Release fields of the tags from the resolution on. PTN reads their
+    unrecognised words as a title; they are kept under `excess`.
+    """
+    parsed = PTN.parse(tags)
+    words = parsed.pop("title", None)
+    if words:
+        excess = parsed.get("excess") or []
+        parsed["excess"] = ([excess] if isinstance(excess, str) else excess) + [words]
+    if not parsed.get("language"):
+        languages = _trailing_languages(tags)
+        if languages:
+            parsed["language"] = languages
+    return parsed
+
+
+def _parse_whole(name: str) -> dict:
+    parsed = PTN.parse(name)
+    if not parsed.get("language"):
+        languages = _trailing_languages(name)
+        if languages:
+            parsed["language"] = languages
+    return parsed
+
+
+def _freeze(parsed: dict) -> tuple:
+    """Memo entries are immutable, so a caller editing its result cannot corrupt them."""
+    return tuple((k, tuple(v) if isinstance(v, list) else v) for k, v in parsed.items())
+
+
+def _thaw(frozen: tuple) -> dict:
+    return {k: list(v) if isinstance(v, tuple) else v for k, v in frozen}
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _memo_tags(tags: str) -> tuple:
+    return _freeze(_parse_tags(tags))
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _memo_whole(name: str) -> tuple:
+    return _freeze(_parse_whole(name))
+
+
+def _whole(name: str, whole_parser) -> dict:
+    """PTN on the whole name, memoized per season pack (see _canonical)."""
+    matches = _EPISODE.findall(name)
+    if len(matches) != 1:
+        return _thaw(whole_parser(name))
+    template = _EPISODE.sub(lambda m: m.group(1) + _CANONICAL_EPISODE, name)
+    parsed = _thaw(whole_parser(template))
+    if parsed.get("episode") != int(_CANONICAL_EPISODE):
+        # PTN read the episode from somewhere else; do not guess.
+        return _thaw(whole_parser(name))
+    parsed["episode"] = int(matches[0][1])
+    return parsed
+
+
+def _parse(name: str, tags_parser, whole_parser) -> dict:
+    match = _RESOLUTION.search(name)
+    head = _parse_head(name[:match.start()]) if match else None
+    if head is None:
+        return _whole(name, whole_parser)
+    parsed = _thaw(tags_parser(name[match.start():]))
+    if head.get("language") and not parsed.get("language"):
+        parsed["language"] = head.pop("language")
+    head.pop("language", None)
+    parsed.update(head)
+    return parsed
+
+
+def _parse_uncached(name: str) -> dict:
+    """parse() without the memos, for checking them."""
+    return _parse(name, lambda tags: _freeze(_parse_tags(tags)), lambda whole: _freeze(_parse_whole(whole)))
+
+
+def parse(filename: str) -> dict:
+    """
+    PTN-style fields of a cleaned filename, with languages PTN missed filled
+    in from the release tags. Returns a new dict each time; callers may
+    modify it.
+
+    A plain head (title, year, SxxEyy before the resolution) is read with
+    compiled patterns; only the release tags from the resolution on go
+    through PTN, memoized, so every release by the same group costs one PTN
+    call. Other names go through PTN whole, memoized per season pack.
+    """
+    return _parse(filename, _memo_tags, _memo_whole)
+
+
+def clear_cache() -> None:
+    _memo_tags.cache_clear()
+    _memo_whole.cache_clear()
+
+
+def cache_info() -> dict:
+    tags, whole = _memo_tags.cache_info(), _memo_whole.cache_info()
+    return {"hits": tags.hits + whole.hits, "misses": tags.misses + whole.misses,
+            "tag_entries": tags.currsize, "whole_entries": whole.currsize}
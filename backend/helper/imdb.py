@@ -1,39 +1,138 @@
+import asyncio
+import random
+from time import monotonic
+from typing import Dict, Optional
+
 import httpx
 from Backend.config import Telegram
+from backend.helper.ratelimit import imdb_limiter
+from Backend.logger import LOGGER
 
 BASE_URL = Telegram.IMDB_API
 
+# Statuses worth another attempt; anything else is returned to the caller as a failure.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_client: Optional[httpx.AsyncClient] = None
+_metrics: Dict[str, Dict[str, float]] = {}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401  (installed with httpx[http2])
+        return True
+    except ImportError:
+        return False
+
+
+def _new_client() -> httpx.AsyncClient:
+    http2 = Telegram.IMDB_HTTP2 and _http2_available()
+    if Telegram.IMDB_HTTP2 and not http2:
+        LOGGER.warning("IMDB_HTTP2 is set but the h2 package is missing; using HTTP/1.1")
+    return httpx.AsyncClient(
+        base_url=BASE_URL,
+        http2=http2,
+        timeout=httpx.Timeout(Telegram.IMDB_TIMEOUT, connect=Telegram.IMDB_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=Telegram.IMDB_MAX_CONNECTIONS,
+            max_keepalive_connections=Telegram.IMDB_MAX_CONNECTIONS,
+            keepalive_expiry=60,
+        ),
+    )
+
+
+async def start():
+    """Open the shared connection pool. Called once at startup."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _new_client()
+
+
+async def close():
+    """Close the shared connection pool. Called once at shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def stats() -> dict:
+    """Per-endpoint call counts, failures, retries and latency in milliseconds."""
+    return {
+        name: {
+            "calls": int(m["calls"]),
+            "errors": int(m["errors"]),
+            "retries": int(m["retries"]),
+            "avg_ms": round(m["total"] / m["calls"] * 1000, 1) if m["calls"] else 0,
+            "max_ms": round(m["max"] * 1000, 1),
+        }
+        for name, m in _metrics.items()
+    }
+
+
+def _record(name: str, elapsed: float, failed: bool, retries: int) -> None:
+    m = _metrics.setdefault(name, {"calls": 0, "errors": 0, "retries": 0, "total": 0.0, "max": 0.0})
+    m["calls"] += 1
+    m["errors"] += failed
+    m["retries"] += retries
+    m["total"] += elapsed
+    m["max"] = max(m["max"], elapsed)
+
+
+async def _get(name: str, path: str, params: Optional[dict] = None) -> dict:
+    """GET through the shared pool, retrying transport errors and RETRY_STATUSES with jittered backoff."""
+    if _client is None or _client.is_closed:
+        await start()
+    started = monotonic()
+    attempt = 0
+    try:
+        while True:
+            try:
+                await imdb_limiter.acquire()
+                response = await _client.get(path, params=params)
+                if response.status_code == 200:
+                    _record(name, monotonic() - started, False, attempt)
+                    return response.json()
+                error = Exception(f"Request failed with status code {response.status_code}")
+                if response.status_code not in RETRY_STATUSES:
+                    raise error
+                retry_after = response.headers.get("Retry-After")
+            except httpx.TransportError as e:
+                error, retry_after = e, None
+
+            if attempt >= Telegram.IMDB_RETRIES:
+                raise error
+            # Full jitter: spread retries from many files over the whole window.
+            backoff = random.uniform(0, Telegram.IMDB_RETRY_BACKOFF * 2 ** attempt)
+            if retry_after and retry_after.isdigit():
+                backoff = max(backoff, int(retry_after))
+            attempt += 1
+            await asyncio.sleep(backoff)
+    except Exception:
+        _record(name, monotonic() - started, True, attempt)
+        raise
+
+
 async def search_title(query: str, type: str):
-    async with httpx.AsyncClient() as client:
-        url = f"{BASE_URL}/search?query={query}"
-        response = await client.get(url)
-        if response.status_code != 200:
-            raise Exception(f"Request failed with status code {response.status_code}")
-        data = response.json()
-
-        if data and 'results' in data:
-            for result in data['results']:
-                if result.get('type') == type:
-                    return result
-        return None
+    data = await _get("search", "/search", params={"query": query})
+    if data and 'results' in data:
+        for result in data['results']:
+            if result.get('type') == type:
+                return result
+    return None
 
 async def get_detail(imdb_id: str):
-    async with httpx.AsyncClient() as client:
-        url = f"{BASE_URL}/title/tt{imdb_id}"
-        response = await client.get(url)
-        if response.status_code != 200:
-            raise Exception(f"Request failed with status code {response.status_code}")
-        return response.json()
+    return await _get("title", f"/title/tt{imdb_id}")
+
+async def get_season_payload(imdb_id: str, season_id: int):
+    return await _get("season", f"/title/tt{imdb_id}/season/{season_id}")
+
+def index_episodes(payload: Optional[dict]) -> Dict[str, dict]:
+    """Episodes of a season payload keyed by episode number (as a string, so it stores in BSON)."""
+    return {str(episode.get('no')): episode for episode in (payload or {}).get('episodes', [])}
+
+async def get_season_episodes(imdb_id: str, season_id: int) -> Dict[str, dict]:
+    return index_episodes(await get_season_payload(imdb_id, season_id))
 
 async def get_season(imdb_id: str, season_id: int, episode_id: int):
-    async with httpx.AsyncClient() as client:
-        url = f"{BASE_URL}/title/tt{imdb_id}/season/{season_id}"
-        response = await client.get(url)
-        if response.status_code != 200:
-            raise Exception(f"Request failed with status code {response.status_code}")
-        data = response.json()
-
-        for episode in data.get('episodes', []):
-            if episode.get('no') == str(episode_id):
-                return episode
-        return None
\ No newline at end of file
+    return (await get_season_episodes(imdb_id, season_id)).get(str(episode_id))
@@ -0,0 +1,107 @@
+from datetime import datetime
+from typing import Optional, Set, Tuple
+
+from backend import db
+from backend.helper.encrypt import decode_string
+from backend.logger import LOGGER
+
+
+Post = Tuple[int, int]
+
+
+class KnownFiles:
+    """
+    Files already in the catalog, by Telegram file_unique_id and by
+    (chat_id, msg_id). Re-posts and re-forwards are dropped with one set
+    lookup, before any parsing or provider call. The sets are mirrored in
+    the `known_files` collection (one row per post) and loaded at startup;
+    a title's rows go when the title is deleted.
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self.skipped = 0
+        self._unique: Set[str] = set()
+        self._posts: Set[Post] = set()
+
+    @property
+    def _collection(self):
+        return self.database.db["known_files"]
+
+    def claim(self, unique_id: str, chat_id: int, msg_id: int) -> bool:
+        """
+        False when the file or post is already known. Otherwise it is
+        reserved, so a second copy arriving before the first is written is
+        dropped as well; call release() if the write fails.
+        """
+        if unique_id in self._unique or (chat_id, msg_id) in self._posts:
+            self.skipped += 1
+            return False
+        self._unique.add(unique_id)
+        self._posts.add((chat_id, msg_id))
+        return True
+
+    def release(self, unique_id: str, chat_id: int, msg_id: int) -> None:
+        self._unique.discard(unique_id)
+        self._posts.discard((chat_id, msg_id))
+
+    async def add(self, chat_id: int, msg_id: int, media_type: str, tmdb_id: int,
+                  unique_id: Optional[str] = None) -> None:
+        """Record a catalogued post; called again when enrichment moves it to its real title."""
+        self._posts.add((chat_id, msg_id))
+        # IMDb-resolved ids arrive as strings; the catalog stores (and notifies) ints.
+        fields = {"media_type": media_type, "tmdb_id": int(tmdb_id), "updated_on": datetime.utcnow()}
+        if unique_id:
+            self._unique.add(unique_id)
+            fields["unique_id"] = unique_id
+        try:
+            await self._collection.update_one(
+                {"_id": f"{chat_id}:{msg_id}"},
+                {"$set": fields, "$setOnInsert": {"chat_id": chat_id, "msg_id": msg_id}},
+                upsert=True)
+        except Exception as e:
+            LOGGER.error(f"Error recording known file {chat_id}:{msg_id}: {e}")
+
+    async def _seed(self) -> int:
+        """Fill an empty collection from the catalog's file rows (posts only; they carry no unique id)."""
+        seeded = 0
+        for shard in self.database.shards:
+            async for row in shard.files.find({}, {"_id": 0, "id": 1, "media_type": 1, "tmdb_id": 1}):
+                try:
+                    data = await decode_string(row["id"])
+                except Exception as e:
+                    LOGGER.debug(f"Skipping undecodable file id {row['id']}: {e}")
+                    continue
+                await self.add(data["chat_id"], data["msg_id"], row["media_type"], row["tmdb_id"])
+                seeded += 1
+        return seeded
+
+    async def load(self) -> None:
+        """Read the known posts into memory. Called once after db.connect()."""
+        await self._collection.create_index("unique_id", sparse=True)
+        await self._collection.create_index([("media_type", 1), ("tmdb_id", 1)])
+        async for doc in self._collection.find({}, {"chat_id": 1, "msg_id": 1, "unique_id": 1}):
+            self._posts.add((doc["chat_id"], doc["msg_id"]))
+            if doc.get("unique_id"):
+                self._unique.add(doc["unique_id"])
+        if not self._posts:
+            seeded = await self._seed()
+            if seeded:
+                LOGGER.info(f"Seeded known files from {seeded} catalog rows")
+        LOGGER.info(f"Known files loaded: {len(self._posts)} posts, {len(self._unique)} file ids")
+
+    async def on_catalog_change(self, event: dict) -> None:
+        """Forget the posts of a deleted title, so posting them again adds them back."""
+        if event["action"] != "delete":
+            return
+        query = {"media_type": event["media_type"], "tmdb_id": event["tmdb_id"]}
+        async for doc in self._collection.find(query, {"chat_id": 1, "msg_id": 1, "unique_id": 1}):
+            self._posts.discard((doc["chat_id"], doc["msg_id"]))
+            self._unique.discard(doc.get("unique_id"))
+        await self._collection.delete_many(query)
+
+    def stats(self) -> dict:
+        return {"posts": len(self._posts), "file_ids": len(self._unique), "skipped": self.skipped}
+
+
+known_files = KnownFiles(db)
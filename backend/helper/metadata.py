@@ -1,40 +1,205 @@
 import asyncio
-import PTN
-from Backend.helper.imdb import get_detail, get_season, search_title
-from Backend.helper.pyro import extract_tmdb_id, normalize_languages
+from hashlib import blake2b
+from typing import Optional
+from backend.helper.filenames import normalize_languages, parse
+from backend.helper.imdb import get_detail, get_season_episodes, search_title
+from backend.helper.metadata_cache import metadata_cache, normalize_query
+from Backend.helper.pyro import extract_tmdb_id
+from backend.helper.ratelimit import tmdb_limiter
+from backend.helper.resilience import SingleFlight, hedged, imdb_breaker, tmdb_breaker
 from themoviedb import aioTMDb
 from Backend.config import Telegram
 import Backend
 from Backend.logger import LOGGER
 import traceback
 
+tmdb = aioTMDb(key=Telegram.TMDB_API, language="en-US", region="US")
 
-DELAY = 2
 
-tmdb = aioTMDb(key=Telegram.TMDB_API, language="en-US", region="US")
+# Cached lookups. Every provider response is reduced to a plain dict holding
+# the fields used below, so it can be stored in MongoDB. Requests that do go
+# out wait for their provider's token bucket (IMDb's is applied in imdb.py).
 
-async def metadata(filename: str, media) -> dict:
-    try:
-        parsed = PTN.parse(filename)
-        if 'excess' in parsed and any('combined' in item.lower() for item in parsed['excess']):
-            LOGGER.info(f"Skipping {filename} due to 'combined' in excess")
-            return None
+def _date(value) -> str:
+    return value.isoformat() if value else ''
 
-        title = parsed.get('title')
-        season = parsed.get('season')
-        episode = parsed.get('episode')
-        year = parsed.get('year')
-        quality = parsed.get('resolution')
-        languages = normalize_languages(parsed.get('language'))
-        rip = parsed.get('quality')
 
-        if isinstance(season, list) or isinstance(episode, list):
-            LOGGER.warning(f"Invalid format: Season/Episode is list — {filename}, parsed: {parsed}")
-            return None
+def _genres(details) -> list:
+    return [genre.name for genre in details.genres] if details.genres else []
+
+
+async def imdb_search(query: str, type: str):
+    async def fetch():
+        return await search_title(query=query, type=type)
+    return await metadata_cache.fetch("imdb_search", f"{type}:{normalize_query(query)}", fetch)
+
+
+async def imdb_detail(imdb_id: str):
+    async def fetch():
+        return await get_detail(imdb_id=imdb_id)
+    return await metadata_cache.fetch("imdb_title", imdb_id, fetch)
+
+
+async def imdb_episode(imdb_id: str, season: int, episode: int):
+    async def fetch():
+        return await get_season_episodes(imdb_id=imdb_id, season_id=season) or None
+    episodes = await metadata_cache.fetch("imdb_episodes", f"{imdb_id}:{season}", fetch)
+    return (episodes or {}).get(str(episode))
+
+
+async def tmdb_search_tv(query: str):
+    async def fetch():
+        await tmdb_limiter.acquire()
+        results = await tmdb.search().tv(query=query)
+        return {"id": results[0].id} if results else None
+    return await metadata_cache.fetch("tmdb_search_tv", normalize_query(query), fetch)
+
+
+async def tmdb_tv_details(tv_id: int):
+    async def fetch():
+        await tmdb_limiter.acquire()
+        details = await tmdb.tv(tv_id).details()
+        return {
+            "id": details.id,
+            "name": details.name,
+            "first_air_date": _date(details.first_air_date),
+            "vote_average": details.vote_average or 0,
+            "overview": details.overview or '',
+            "number_of_seasons": details.number_of_seasons or 0,
+            "number_of_episodes": details.number_of_episodes or 0,
+            "poster_path": details.poster_path,
+            "backdrop_path": details.backdrop_path,
+            "status": details.status,
+            "genres": _genres(details),
+        }
+    return await metadata_cache.fetch("tmdb_tv", str(tv_id), fetch)
+
+
+async def tmdb_episode(tv_id: int, season: int, episode: int):
+    """One episode, picked from the whole season fetched in a single request."""
+    async def fetch():
+        await tmdb_limiter.acquire()
+        details = await tmdb.season(tv_id, season).details()
+        return {
+            str(item.episode_number): {"name": item.name, "still_path": item.still_path}
+            for item in (details.episodes or [])
+        } or None
+    episodes = await metadata_cache.fetch("tmdb_episodes", f"{tv_id}:{season}", fetch)
+    return (episodes or {}).get(str(episode))
+
 
-        if season and not episode:
-            LOGGER.warning(f"Missing episode for season: {filename}, parsed: {parsed}")
+async def tmdb_search_movie(query: str, year=None):
+    async def fetch():
+        await tmdb_limiter.acquire()
+        results = await tmdb.search().movies(query=query, year=year) if year else await tmdb.search().movies(query=query)
+        return {"id": results[0].id} if results else None
+    return await metadata_cache.fetch("tmdb_search_movie", f"{normalize_query(query)}:{year or ''}", fetch)
+
+
+async def tmdb_movie_details(movie_id: int):
+    async def fetch():
+        await tmdb_limiter.acquire()
+        details = await tmdb.movie(movie_id).details()
+        return {
+            "id": details.id,
+            "title": details.title,
+            "release_date": _date(details.release_date),
+            "vote_average": details.vote_average or 0,
+            "overview": details.overview or '',
+            "poster_path": details.poster_path,
+            "backdrop_path": details.backdrop_path,
+            "runtime": details.runtime or 0,
+            "genres": _genres(details),
+        }
+    return await metadata_cache.fetch("tmdb_movie", str(movie_id), fetch)
+
+def parse_media(filename: str) -> Optional[dict]:
+    """
+    Everything the filename alone says about a file, without remote calls.
+    None when the name is not something the catalog can hold.
+    """
+    parsed = parse(filename)
+    if 'excess' in parsed and any('combined' in item.lower() for item in parsed['excess']):
+        LOGGER.info(f"Skipping {filename} due to 'combined' in excess")
+        return None
+
+    title = parsed.get('title')
+    season = parsed.get('season')
+    episode = parsed.get('episode')
+
+    if isinstance(season, list) or isinstance(episode, list):
+        LOGGER.warning(f"Invalid format: Season/Episode is list — {filename}, parsed: {parsed}")
+        return None
+
+    if season and not episode:
+        LOGGER.warning(f"Missing episode for season: {filename}, parsed: {parsed}")
+        return None
+
+    if not title:
+        LOGGER.info(f"No title parsed from: {filename} (parsed: {parsed})")
+        return None
+
+    return {
+        "title": title,
+        "season": season,
+        "episode": episode,
+        "year": parsed.get('year'),
+        "quality": parsed.get('resolution'),
+        "languages": normalize_languages(parsed.get('language')),
+        "rip": parsed.get('quality'),
+    }
+
+
+def provisional_id(media_type: str, title: str, year=None) -> int:
+    """
+    Negative stand-in for a tmdb_id, stable per parsed title and year so the
+    episodes of one show share a placeholder. 48 bits keep it exact in JSON.
+    """
+    key = f"{media_type}:{normalize_query(title)}:{year or ''}".encode()
+    return -(int.from_bytes(blake2b(key, digest_size=6).digest(), "big") + 1)
+
+
+def provisional_metadata(parsed: dict) -> dict:
+    """A catalog record built from parse_media() output alone, to be enriched later."""
+    title, season, episode, year = parsed['title'], parsed['season'], parsed['episode'], parsed['year']
+    media_type = "tv" if season and episode else "movie"
+    info = {
+        "tmdb_id": provisional_id(media_type, title, year),
+        "title": title,
+        "year": year or 0,
+        "rate": 0,
+        "description": '',
+        "poster": '',
+        "backdrop": '',
+        "genres": [],
+        "media_type": media_type,
+        "quality": parsed['quality'],
+        "languages": parsed['languages'] or ['hi'],
+        "rip": parsed['rip'] or 'Blu-ray',
+        "provisional": True,
+    }
+    if media_type == "movie":
+        info["runtime"] = 0
+    else:
+        info.update({
+            "status": 'Unknown',
+            "total_seasons": 0,
+            "total_episodes": 0,
+            "season_number": season,
+            "episode_number": episode,
+            "episode_title": f"S{season}E{episode}",
+            "episode_backdrop": '',
+        })
+    return info
+
+
+async def metadata(filename: str, media) -> dict:
+    try:
+        parsed = parse_media(filename)
+        if parsed is None:
             return None
+        title, season, episode, year = parsed['title'], parsed['season'], parsed['episode'], parsed['year']
+        quality, languages, rip = parsed['quality'], parsed['languages'], parsed['rip']
 
         try:
             default_id = extract_tmdb_id(Backend.USE_DEFAULT_ID)
@@ -49,119 +214,151 @@ async def metadata(filename: str, media) -> dict:
                 LOGGER.debug(f"Failed to extract TMDB ID from filename {filename}: {e}")
                 default_id = None
 
-        if title:
-            if season and episode:
-                LOGGER.info(f"Fetching TV metadata for: {title} S{season}E{episode}")
-                return await fetch_tv_metadata(title, season, episode, year, quality, default_id, languages, rip)
-            else:
-                LOGGER.info(f"Fetching movie metadata for: {title} ({year})")
-                return await fetch_movie_metadata(title, year, quality, default_id, languages, rip)
+        if season and episode:
+            LOGGER.info(f"Fetching TV metadata for: {title} S{season}E{episode}")
+            return await fetch_tv_metadata(title, season, episode, year, quality, default_id, languages, rip)
+        LOGGER.info(f"Fetching movie metadata for: {title} ({year})")
+        return await fetch_movie_metadata(title, year, quality, default_id, languages, rip)
 
-        LOGGER.info(f"No title parsed from: {filename} (parsed: {parsed})")
+    except Exception as e:
+        LOGGER.error(f"Unhandled error while parsing metadata for {filename}: {e}")
         return None
 
+
+# Episodes of a forwarded season pack resolve their show together.
+show_flights = SingleFlight()
+
+
+def _show_key(provider: str, title: str, year=None, show_id=None) -> str:
+    """Identity of a show as parsed from a filename: an explicit id, else title and year."""
+    if show_id:
+        return f"{provider}:{show_id}"
+    return f"{provider}:{normalize_query(title)}:{year or ''}"
+
+
+async def _imdb_show_id(title: str, year=None):
+    result = await imdb_search(f"{title} {year}" if year else title, "tvSeries")
+    return result['id'] if result else None
+
+
+async def _imdb_show(imdb_id: str, title: str):
+    """Show fields from IMDb (with a TMDB backdrop and status), None when not found."""
+    tv_details = await imdb_detail(imdb_id)
+    if not tv_details:
+        return None
+
+    show_title = tv_details.get('title', title)
+    backdrop, status = '', 'Unknown'
+    try:
+        fallback_result = await tmdb_search_tv(show_title)
+        if fallback_result:
+            fallback_detail = await tmdb_tv_details(fallback_result['id'])
+            backdrop = f"https://image.tmdb.org/t/p/original{fallback_detail['backdrop_path']}" if fallback_detail['backdrop_path'] else ''
+            status = fallback_detail['status'] or 'Unknown'
     except Exception as e:
-        LOGGER.error(f"Unhandled error while parsing metadata for {filename}: {e}")
+        LOGGER.warning(f"Fallback TMDb metadata fetch failed: {e}")
+
+    return {
+        "tmdb_id": tv_details['id'].replace("tt", ""),
+        "title": show_title,
+        "year": tv_details.get('releaseDetailed', {}).get('year', 0),
+        "rate": tv_details.get('rating', {}).get('star', 0),
+        "description": tv_details.get('plot', ''),
+        "total_seasons": len(tv_details.get('all_seasons', [])),
+        "total_episodes": sum(len(s.get('episodes', [])) for s in tv_details.get('seasons', [])),
+        "poster": tv_details.get('image', ''),
+        "backdrop": backdrop,
+        "status": status,
+        "genres": tv_details.get('genre', []),
+    }
+
+
+async def _tv_from_imdb(title: str, season: int, episode: int, year=None, imdb_id=None):
+    """Show and episode fields from IMDb, None when IMDb does not know the episode."""
+    if not imdb_id:
+        imdb_id = await show_flights.do(_show_key("imdb-search", title, year),
+                                        lambda: _imdb_show_id(title, year))
+    if not imdb_id:
+        return None
+    # The season is fetched alongside the show details, not after them.
+    show, ep_details = await asyncio.gather(
+        show_flights.do(_show_key("imdb", title, show_id=imdb_id), lambda: _imdb_show(imdb_id, title)),
+        imdb_episode(imdb_id, season, episode))
+    if not show or not ep_details:
         return None
 
+    details = dict(show)
+    details["episode_title"] = ep_details.get('title', f"S{season}E{episode}")
+    details["episode_backdrop"] = ep_details.get('image', '')
+    return details
+
+
+async def _tmdb_show_id(title: str):
+    tmdb_result = await tmdb_search_tv(title)
+    if not tmdb_result:
+        LOGGER.warning(f"No TMDb results found for title '{title}'")
+        return None
+    LOGGER.debug(f"TMDb ID found: {tmdb_result['id']}")
+    return tmdb_result['id']
+
+
+async def _tmdb_show(tv_id: int):
+    """Show fields from TMDB."""
+    tv_details = await tmdb_tv_details(tv_id)
+
+    return {
+        "tmdb_id": tv_details['id'],
+        "title": tv_details['name'],
+        "year": int(tv_details['first_air_date'][:4]) if tv_details['first_air_date'] else 0,
+        "rate": tv_details['vote_average'],
+        "description": tv_details['overview'],
+        "total_seasons": tv_details['number_of_seasons'],
+        "total_episodes": tv_details['number_of_episodes'],
+        "poster": f"https://image.tmdb.org/t/p/w500{tv_details['poster_path']}" if tv_details['poster_path'] else '',
+        "backdrop": f"https://image.tmdb.org/t/p/original{tv_details['backdrop_path']}" if tv_details['backdrop_path'] else '',
+        "status": tv_details['status'] or 'Unknown',
+        "genres": tv_details['genres'],
+    }
+
+
+async def _tv_from_tmdb(title: str, season: int, episode: int):
+    """Show and episode fields from TMDB, None when the show is not found."""
+    tv_id = await show_flights.do(_show_key("tmdb-search", title), lambda: _tmdb_show_id(title))
+    if not tv_id:
+        return None
+    show, ep_details = await asyncio.gather(
+        show_flights.do(_show_key("tmdb", title, show_id=tv_id), lambda: _tmdb_show(tv_id)),
+        tmdb_episode(tv_id, season, episode))
 
+    details = dict(show)
+    details["episode_title"] = ep_details['name'] if ep_details and ep_details['name'] else f"S{season}E{episode}"
+    details["episode_backdrop"] = f"https://image.tmdb.org/t/p/original{ep_details['still_path']}" if ep_details and ep_details['still_path'] else ''
+    return details
 
 
 async def fetch_tv_metadata(title: str, season: int, episode: int, year=None, quality=None, default_id=None, languages=None, rip=None) -> dict:
     try:
-        tv_details, ep_details, use_tmdb = None, None, False
         imdb_id = default_id if default_id and default_id.startswith("tt") else None
-
-        if not imdb_id:
-            result = await search_title(query=f"{title} {year}" if year else title, type="tvSeries")
-            imdb_id = result['id'] if result else None
-
-        if imdb_id:
-            try:
-                await asyncio.sleep(DELAY)
-                tv_details = await get_detail(imdb_id=imdb_id)
-                await asyncio.sleep(DELAY)
-                ep_details = await get_season(imdb_id=imdb_id, season_id=season, episode_id=episode)
-            except Exception as e:
-                LOGGER.warning(f"IMDb TV fetch failed for ID {imdb_id}: {e}")
-                tv_details, ep_details = None, None
-
-        if not tv_details or not ep_details:
-            use_tmdb = True
-            await asyncio.sleep(DELAY)
-            tmdb_results = await tmdb.search().tv(query=title)
-            if not tmdb_results:
-                LOGGER.warning(f"No TMDb results found for title '{title}'")
-                return None
-            tv_id = tmdb_results[0].id
-            LOGGER.debug(f"TMDb ID found: {tv_id}")
-            tv_details = await tmdb.tv(tv_id).details()
-            ep_details = await tmdb.episode(tv_id, season, episode).details()
-
-        if use_tmdb:
-            tmdb_id = tv_details.id
-            show_title = tv_details.name
-            show_year = tv_details.first_air_date.year if tv_details.first_air_date else 0
-            rate = tv_details.vote_average or 0
-            description = tv_details.overview or ''
-            total_seasons = tv_details.number_of_seasons or 0
-            total_episodes = tv_details.number_of_episodes or 0
-            poster = f"https://image.tmdb.org/t/p/w500{tv_details.poster_path}" if tv_details.poster_path else ''
-            backdrop = f"https://image.tmdb.org/t/p/original{tv_details.backdrop_path}" if tv_details.backdrop_path else ''
-            status = tv_details.status or 'Unknown'
-            genres = [genre.name for genre in tv_details.genres] if tv_details.genres else []
-            ep_title = ep_details.name if ep_details and hasattr(ep_details, 'name') else f"S{season}E{episode}"
-            ep_backdrop = f"https://image.tmdb.org/t/p/original{ep_details.still_path}" if ep_details and ep_details.still_path else ''
-        else:
-            tmdb_id = tv_details['id'].replace("tt", "")
-            show_title = tv_details.get('title', title)
-            show_year = tv_details.get('releaseDetailed', {}).get('year', 0)
-            rate = tv_details.get('rating', {}).get('star', 0)
-            description = tv_details.get('plot', '')
-            total_seasons = len(tv_details.get('all_seasons', []))
-            total_episodes = sum(len(season.get('episodes', [])) for season in tv_details.get('seasons', []))
-            poster = tv_details.get('image', '')
-            backdrop = ''
-            genres = tv_details.get('genre', [])
-            ep_title = ep_details.get('title', f"S{season}E{episode}") if ep_details else f"S{season}E{episode}"
-            ep_backdrop = ep_details.get('image', '') if ep_details else ''
-            try:
-                await asyncio.sleep(DELAY)
-                fallback_results = await tmdb.search().tv(query=show_title)
-                if fallback_results:
-                    fallback_id = fallback_results[0].id
-                    fallback_detail = await tmdb.tv(fallback_id).details()
-                    backdrop = f"https://image.tmdb.org/t/p/original{fallback_detail.backdrop_path}" if fallback_detail.backdrop_path else ''
-                    status = fallback_detail.status or 'Unknown'
-                else:
-                    status = 'Unknown'
-            except Exception as e:
-                LOGGER.warning(f"Fallback TMDb metadata fetch failed: {e}")
-                status = 'Unknown'
+        details = await hedged(
+            f"'{title}' S{season}E{episode}",
+            (imdb_breaker, lambda: _tv_from_imdb(title, season, episode, year, imdb_id)),
+            (tmdb_breaker, lambda: _tv_from_tmdb(title, season, episode)),
+            Telegram.METADATA_HEDGE_DELAY
+        )
+        if not details:
+            return None
 
         result = {
-            "tmdb_id": tmdb_id,
-            "title": show_title,
-            "year": show_year,
-            "rate": rate,
-            "description": description,
-            "total_seasons": total_seasons,
-            "total_episodes": total_episodes,
-            "poster": poster,
-            "backdrop": backdrop,
-            "status": status,
-            "genres": genres,
+            **details,
             "media_type": "tv",
             "season_number": season,
             "episode_number": episode,
-            "episode_title": ep_title,
-            "episode_backdrop": ep_backdrop,
             "quality": quality,
             "languages": languages or ['hi'],
             "rip": rip or 'Blu-ray'
         }
 
-        LOGGER.info(f"Metadata successfully fetched for {show_title} S{season}E{episode}")
+        LOGGER.info(f"Metadata successfully fetched for {result['title']} S{season}E{episode}")
         return result
 
     except Exception as e:
@@ -169,86 +366,82 @@ async def fetch_tv_metadata(title: str, season: int, episode: int, year=None, qu
         return None
 
 
+async def _movie_from_imdb(title: str, year=None, imdb_id=None):
+    """Movie fields from IMDb, None when IMDb has no match."""
+    if not imdb_id:
+        result = await imdb_search(f"{title} {year}" if year else title, "movie")
+        imdb_id = result['id'] if result else None
+    if not imdb_id:
+        return None
 
+    clean_id = imdb_id[2:] if imdb_id.startswith("tt") else imdb_id
+    LOGGER.debug(f"Fetching IMDb details using ID: {clean_id}")
+    movie_details = await imdb_detail(clean_id)
+    if not movie_details:
+        return None
 
-async def fetch_movie_metadata(title: str, year=None, quality=None, default_id=None, languages=None, rip=None) -> dict:
+    movie_title = movie_details.get('title', title)
+    movie_year = movie_details.get('releaseDetailed', {}).get('year', 0)
     try:
-        movie_details, use_tmdb = None, False
-        imdb_id = default_id if default_id and default_id.startswith("tt") else None
+        force_result = await tmdb_search_movie(movie_title, movie_year)
+        force_movie_details = await tmdb_movie_details(force_result['id'])
+        backdrop = f"https://image.tmdb.org/t/p/original{force_movie_details['backdrop_path']}" if force_movie_details['backdrop_path'] else ''
+        poster = movie_details.get('image', '') or \
+                 (f"https://image.tmdb.org/t/p/w500{force_movie_details['poster_path']}" if force_movie_details['poster_path'] else '')
+    except Exception as e:
+        backdrop = ''
+        poster = ''
+
+    return {
+        "tmdb_id": movie_details['id'].replace("tt", ""),
+        "title": movie_title,
+        "year": movie_year,
+        "rate": movie_details.get('rating', {}).get('star', 0),
+        "description": movie_details.get('plot', ''),
+        "poster": poster,
+        "backdrop": backdrop,
+        "genres": movie_details.get('genre', []),
+        "runtime": movie_details.get('runtimeSeconds', 0) // 60,
+    }
+
+
+async def _movie_from_tmdb(title: str, year=None):
+    """Movie fields from TMDB, None when the movie is not found."""
+    tmdb_result = await tmdb_search_movie(title, year)
+    if not tmdb_result:
+        LOGGER.warning(f"No TMDB results found for '{title}'")
+        return None
+    movie_details = await tmdb_movie_details(tmdb_result['id'])
 
-        if not imdb_id:
-            try:
-                result = await search_title(query=f"{title} {year}" if year else title, type="movie")
-                imdb_id = result['id'] if result else None
-                
-            except Exception as e:
-                LOGGER.warning(f"IMDb search failed for '{title}': {e}")
-                imdb_id = None
+    return {
+        "tmdb_id": movie_details['id'],
+        "title": movie_details['title'],
+        "year": int(movie_details['release_date'][:4]) if movie_details['release_date'] else 0,
+        "rate": movie_details['vote_average'],
+        "description": movie_details['overview'],
+        "poster": f"https://image.tmdb.org/t/p/w500{movie_details['poster_path']}" if movie_details['poster_path'] else '',
+        "backdrop": f"https://image.tmdb.org/t/p/original{movie_details['backdrop_path']}" if movie_details['backdrop_path'] else '',
+        "genres": movie_details['genres'],
+        "runtime": movie_details['runtime'],
+    }
 
-        if imdb_id:
-            try:
-                clean_id = imdb_id[2:] if imdb_id.startswith("tt") else imdb_id
-                LOGGER.debug(f"Fetching IMDb details using ID: {clean_id}")
-                movie_details = await get_detail(imdb_id=clean_id)
-               
-            except Exception as e:
-                LOGGER.warning(f"IMDb movie fetch failed for '{title}': {e}")
-                movie_details = None
 
-        if not movie_details:
-            use_tmdb = True
-            try:
-                tmdb_results = await tmdb.search().movies(query=title, year=year) if year else await tmdb.search().movies(query=title)
-                if not tmdb_results:
-                    LOGGER.warning(f"No TMDB results found for '{title}'")
-                    return None
-                movie_id = tmdb_results[0].id
-                movie_details = await tmdb.movie(movie_id).details()
-            except Exception as e:
-                LOGGER.error(f"TMDB search failed for '{title}': {e}")
-                return None
-
-        if use_tmdb:
-            tmdb_id = movie_details.id
-            movie_title = movie_details.title
-            movie_year = movie_details.release_date.year if movie_details.release_date else 0
-            rate = movie_details.vote_average or 0
-            description = movie_details.overview or ''
-            poster = f"https://image.tmdb.org/t/p/w500{movie_details.poster_path}" if movie_details.poster_path else ''
-            backdrop = f"https://image.tmdb.org/t/p/original{movie_details.backdrop_path}" if movie_details.backdrop_path else ''
-            runtime = movie_details.runtime or 0
-            genres = [genre.name for genre in movie_details.genres] if movie_details.genres else []
-        else:
-            description = movie_details.get('plot', '')
-            tmdb_id = movie_details['id'].replace("tt", "")
-            movie_title = movie_details.get('title', title)
-            movie_year = movie_details.get('releaseDetailed', {}).get('year', 0)
-            rate = movie_details.get('rating', {}).get('star', 0)
-            runtime = movie_details.get('runtimeSeconds', 0) // 60
-            genres = movie_details.get('genre', [])
-            try:
-                force_tmdb_results = await tmdb.search().movies(query=movie_title, year=movie_year)
-                force_movie_id = force_tmdb_results[0].id
-                force_movie_details = await tmdb.movie(force_movie_id).details()
-                backdrop = f"https://image.tmdb.org/t/p/original{force_movie_details.backdrop_path}" if force_movie_details.backdrop_path else ''
-                poster = movie_details.get('image', '') or \
-                         (f"https://image.tmdb.org/t/p/w500{force_movie_details.poster_path}" if force_movie_details.poster_path else '')
-            except Exception as e:
-                backdrop = ''
-                poster = ''
+async def fetch_movie_metadata(title: str, year=None, quality=None, default_id=None, languages=None, rip=None) -> dict:
+    try:
+        imdb_id = default_id if default_id and default_id.startswith("tt") else None
+        details = await hedged(
+            f"'{title}' ({year})",
+            (imdb_breaker, lambda: _movie_from_imdb(title, year, imdb_id)),
+            (tmdb_breaker, lambda: _movie_from_tmdb(title, year)),
+            Telegram.METADATA_HEDGE_DELAY
+        )
+        if not details:
+            return None
 
-        LOGGER.info(f"Metadata fetched successfully for '{movie_title}' ({movie_year})")
+        LOGGER.info(f"Metadata fetched successfully for '{details['title']}' ({details['year']})")
         return {
-            "tmdb_id": tmdb_id,
-            "title": movie_title,
-            "year": movie_year,
-            "rate": rate,
-            "description": description,
-            "poster": poster,
-            "backdrop": backdrop,
+            **details,
             "media_type": "movie",
-            "genres": genres,
-            "runtime": runtime,
             "quality": quality,
             "languages": languages or ['hi'],
             "rip": rip or 'Blu-ray'
@@ -256,4 +449,4 @@ async def fetch_movie_metadata(title: str, year=None, quality=None, default_id=N
 
     except Exception as e:
         LOGGER.error(f"Unhandled error in fetch_movie_metadata for '{title}': {e}")
-        return None
\ No newline at end of file
+        return None
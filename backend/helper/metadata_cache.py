@@ -0,0 +1,110 @@
+import re
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from time import monotonic
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from backend import db
+from backend.config import Telegram
+from backend.helper.resilience import SingleFlight
+from backend.logger import LOGGER
+
+
+_SPACES = re.compile(r"\s+")
+
+# Stored in place of None so a lookup that found nothing is cached as well.
+_MISSING = {"__missing__": True}
+
+
+def normalize_query(query: str) -> str:
+    """Cache key form of a search string: case and spacing do not matter."""
+    return _SPACES.sub(" ", query).strip().lower()
+
+
+class MetadataCache:
+    """
+    Two-level cache for IMDb and TMDB responses: a bounded in-process LRU in
+    front of the `metadata_cache` collection, whose TTL index expires rows.
+    Values must be plain BSON-encodable dicts/lists. Results that found
+    nothing are kept for METADATA_NEGATIVE_TTL only, so a title that appears
+    upstream later is picked up.
+
+    Lookups are single-flight: while one is loading a key, other callers for
+    the same key wait on it. When a season pack arrives, every episode shares
+    one search, one show lookup and one season fetch.
+    """
+
+    def __init__(self, database, max_entries: int):
+        self.database = database
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._flights = SingleFlight()
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def _remember(self, key: str, value: Any, ttl: int) -> None:
+        self._memory[key] = (monotonic() + ttl, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def get(self, kind: str, key: str) -> Tuple[bool, Any]:
+        """(found, value); value may be None for a cached miss."""
+        cache_key = f"{kind}:{key}"
+        entry = self._memory.get(cache_key)
+        if entry is not None:
+            if entry[0] >= monotonic():
+                self._memory.move_to_end(cache_key)
+                return True, entry[1]
+            del self._memory[cache_key]
+
+        if self.database.db is not None:
+            try:
+                doc = await self.database.db["metadata_cache"].find_one({"_id": cache_key})
+            except Exception as e:
+                LOGGER.error(f"Error reading metadata cache: {e}")
+                doc = None
+            # The TTL monitor runs once a minute; expired rows can linger until then.
+            if doc and doc["expires_at"] > datetime.utcnow():
+                value = None if doc["value"] == _MISSING else doc["value"]
+                ttl = (doc["expires_at"] - datetime.utcnow()).total_seconds()
+                self._remember(cache_key, value, int(ttl))
+                return True, value
+        return False, None
+
+    async def set(self, kind: str, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        if ttl is None:
+            ttl = Telegram.METADATA_CACHE_TTL if value is not None else Telegram.METADATA_NEGATIVE_TTL
+        cache_key = f"{kind}:{key}"
+        self._remember(cache_key, value, ttl)
+        if self.database.db is None:
+            return
+        try:
+            await self.database.db["metadata_cache"].replace_one(
+                {"_id": cache_key},
+                {"kind": kind, "value": _MISSING if value is None else value,
+                 "expires_at": datetime.utcnow() + timedelta(seconds=ttl)},
+                upsert=True)
+        except Exception as e:
+            LOGGER.error(f"Error writing metadata cache: {e}")
+
+    async def _load(self, kind: str, key: str, producer: Callable[[], Awaitable[Any]]) -> Any:
+        found, value = await self.get(kind, key)
+        if found:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = await producer()
+        await self.set(kind, key, value)
+        return value
+
+    async def fetch(self, kind: str, key: str, producer: Callable[[], Awaitable[Any]]) -> Any:
+        """Cached value for (kind, key), calling the producer and storing its result on a miss."""
+        return await self._flights.do(f"{kind}:{key}", lambda: self._load(kind, key, producer))
+
+    def stats(self) -> dict:
+        return {"entries": len(self._memory), "hits": self.hits, "misses": self.misses,
+                **self._flights.stats()}
+
+
+metadata_cache = MetadataCache(db, max_entries=Telegram.METADATA_CACHE_ENTRIES)
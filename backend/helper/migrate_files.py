@@ -0,0 +1,49 @@
+"""
+Move the telegram quality lists embedded in tv/movie documents into the
+files collection. Documents are also migrated lazily the next time a file is
+ingested for them, so this only needs to run once after upgrading.
+
+Usage: python -m backend.helper.migrate_files
+"""
+import asyncio
+
+from backend import db
+from backend.logger import LOGGER
+
+
+async def migrate_tv_shows(shard) -> int:
+    moved = 0
+    async for doc in shard.tv.find({"seasons.episodes.telegram": {"$exists": True}}):
+        records = db._split_tv_files(doc["tmdb_id"], doc["seasons"])
+        # Write the file rows before stripping the document so an interrupted
+        # run can simply be started again.
+        await db.upsert_files(records, shard)
+        await shard.tv.update_one({"_id": doc["_id"]}, {"$set": {"seasons": doc["seasons"]}})
+        moved += len(records)
+    return moved
+
+
+async def migrate_movies(shard) -> int:
+    moved = 0
+    async for doc in shard.movie.find({"telegram": {"$exists": True}}):
+        records = db._file_records(doc["tmdb_id"], "movie", doc.get("telegram"))
+        await db.upsert_files(records, shard)
+        await shard.movie.update_one({"_id": doc["_id"]}, {"$unset": {"telegram": ""}})
+        moved += len(records)
+    return moved
+
+
+async def main():
+    await db.connect()
+    try:
+        for shard in db.shards:
+            tv_files = await migrate_tv_shows(shard)
+            LOGGER.info(f"Moved {tv_files} tv files into the files collection on {shard.name}")
+            movie_files = await migrate_movies(shard)
+            LOGGER.info(f"Moved {movie_files} movie files into the files collection on {shard.name}")
+    finally:
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
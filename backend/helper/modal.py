@@ -35,6 +35,7 @@ class TVShowSchema(BaseModel):
     languages: List[str] = Field(..., description="List of languages associated with the Movie")
     rip: str = Field(..., description="Media rip of the file")
     seasons: List[Season] = Field(..., description="List of seasons in the TV show")
+    provisional: bool = Field(False, description="Placeholder built from the filename, awaiting metadata")
 
 
 
@@ -52,4 +53,6 @@ class MovieSchema(BaseModel):
     updated_on: datetime = Field(default_factory=datetime.utcnow, description="Timestamp of the last update")
     languages: List[str] = Field(..., description="List of languages associated with the Movie")
     rip: str = Field(..., description="Media rip of the file")
-    telegram: Optional[List[QualityDetail]] = Field(None, description="List of available quality details")
\ No newline at end of file
+    telegram: Optional[List[QualityDetail]] = Field(None, description="List of available quality details")
+    provisional: bool = Field(False, description="Placeholder built from the filename, awaiting metadata")
+
@@ -0,0 +1,175 @@
+from asyncio import gather, sleep as asleep
+from collections import Counter, OrderedDict
+from datetime import datetime
+from math import exp, log
+from time import time
+from typing import Dict, List, Tuple
+
+from pymongo import UpdateOne
+
+from backend import db
+from backend.config import Telegram
+from backend.logger import LOGGER
+
+
+# File id -> (media_type, tmdb_id); file ids never move between titles.
+RESOLVED_CACHE_SIZE = 50000
+
+
+class PlayCounter:
+    """
+    Counts stream starts in memory and writes them behind in batches: every
+    PLAYS_FLUSH_INTERVAL the pending counts become one bulk $inc per
+    collection per shard, on the file row (per episode / quality) and on the
+    title (`plays`, used by sort_by=plays:desc).
+
+    It also keeps an in-process hotness score per title, a play count that
+    halves every PLAYS_HALF_LIFE seconds, for caches deciding what to keep.
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self.flushed = 0
+        self._pending: Counter = Counter()
+        # Counts whose write failed, per file row and per title, so a retry
+        # only repeats the half that did not land.
+        self._retry_files: Counter = Counter()
+        self._retry_titles: Counter = Counter()
+        self._resolved: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        # Hotness is stored as log(score) at a reference time so decay needs
+        # no periodic sweep: score(t) = exp(value - (t - ref) * rate).
+        self._rate = log(2) / Telegram.PLAYS_HALF_LIFE
+        self._reference = time()
+        self._hotness: Dict[Tuple[str, int], float] = {}
+
+    def record(self, file_id: str) -> None:
+        self._pending[file_id] += 1
+
+    def _heat(self, title: Tuple[str, int], count: int) -> None:
+        value = log(count) + (time() - self._reference) * self._rate
+        current = self._hotness.get(title)
+        if current is None:
+            self._hotness[title] = value
+        else:
+            # log(exp(a) + exp(b)) without overflow
+            high, low = max(current, value), min(current, value)
+            self._hotness[title] = high + log(1 + exp(low - high))
+
+    def hotness(self, media_type: str, tmdb_id: int) -> float:
+        """Recent plays of a title, decayed by age."""
+        value = self._hotness.get((media_type, tmdb_id))
+        if value is None:
+            return 0.0
+        return exp(value - (time() - self._reference) * self._rate)
+
+    def hottest(self, limit: int) -> List[Tuple[str, int, float]]:
+        """(media_type, tmdb_id, hotness) of the hottest titles."""
+        ranked = sorted(self._hotness.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(media_type, tmdb_id, self.hotness(media_type, tmdb_id)) for (media_type, tmdb_id), _ in ranked]
+
+    async def _resolve(self, file_ids: List[str]) -> Dict[str, Tuple[str, int]]:
+        resolved = {i: self._resolved[i] for i in file_ids if i in self._resolved}
+        missing = [i for i in file_ids if i not in resolved]
+        if missing:
+            # File ids carry no tmdb_id, so every shard is asked.
+            results = await gather(*(
+                shard.files.find({"id": {"$in": missing}}, {"_id": 0, "id": 1, "tmdb_id": 1, "media_type": 1}).to_list(None)
+                for shard in self.database.shards))
+            for row in (row for rows in results for row in rows):
+                resolved[row["id"]] = self._resolved[row["id"]] = (row["media_type"], row["tmdb_id"])
+            while len(self._resolved) > RESOLVED_CACHE_SIZE:
+                self._resolved.popitem(last=False)
+        return resolved
+
+    async def _write(self, ops: List[UpdateOne], collection, counts: Counter, retry: Counter) -> int:
+        """One bulk write; its counts go back to `retry` if it fails. Returns the plays written."""
+        try:
+            await collection.bulk_write(ops, ordered=False)
+            return sum(counts.values())
+        except Exception as e:
+            retry.update(counts)
+            LOGGER.error(f"Error flushing play counts: {e}")
+            return 0
+
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, Counter()
+        retry_files, self._retry_files = self._retry_files, Counter()
+        retry_titles, self._retry_titles = self._retry_titles, Counter()
+        if not (pending or retry_files or retry_titles):
+            return
+        try:
+            resolved = await self._resolve(list(pending | retry_files))
+            file_plays: Counter = Counter()
+            title_plays: Counter = Counter(retry_titles)
+            new_plays: Counter = Counter()
+            for file_id, count in (pending + retry_files).items():
+                title = resolved.get(file_id)
+                if title is None:
+                    continue  # deleted since it was played
+                file_plays[file_id] += count
+                if file_id in pending:
+                    new_plays[title] += pending[file_id]
+            title_plays.update(new_plays)
+
+            # Titles left on a non-home shard until rebalance are written
+            # where they are; their file rows live with them.
+            shards = {}
+            for media_type in ("movie", "tv"):
+                located = await self.database.locate(
+                    media_type, [tmdb_id for kind, tmdb_id in title_plays if kind == media_type])
+                for tmdb_id, shard in located.items():
+                    shards[(media_type, tmdb_id)] = shard
+        except Exception as e:
+            # Keep the counts for the next attempt rather than losing them.
+            self._pending.update(pending)
+            self._retry_files.update(retry_files)
+            self._retry_titles.update(retry_titles)
+            LOGGER.error(f"Error flushing play counts: {e}")
+            return
+
+        now = datetime.utcnow()
+        file_batches: Dict[object, Tuple[List[UpdateOne], Counter]] = {}
+        for file_id, count in file_plays.items():
+            shard = shards.get(resolved[file_id])
+            if shard is None:
+                continue
+            ops, counts = file_batches.setdefault(shard, ([], Counter()))
+            ops.append(UpdateOne({"id": file_id}, {"$inc": {"plays": count}}))
+            counts[file_id] += count
+        title_batches: Dict[Tuple[object, str], Tuple[List[UpdateOne], Counter]] = {}
+        for title, count in title_plays.items():
+            shard = shards.get(title)
+            if shard is None:
+                continue
+            ops, counts = title_batches.setdefault((shard, title[0]), ([], Counter()))
+            ops.append(UpdateOne({"tmdb_id": title[1]}, {"$inc": {"plays": count}, "$set": {"last_played": now}}))
+            counts[title] += count
+
+        # Each batch is retried on its own, so a shard that failed does not
+        # make the others count twice.
+        written = await gather(
+            *(self._write(ops, shard.files, counts, self._retry_files)
+              for shard, (ops, counts) in file_batches.items()),
+            *(self._write(ops, shard.collection(media_type), counts, self._retry_titles)
+              for (shard, media_type), (ops, counts) in title_batches.items()))
+        for title, count in new_plays.items():
+            self._heat(title, count)
+        if any(written[len(file_batches):]):
+            # Play counts order the plays:desc listings.
+            self.database.touch()
+        self.flushed += sum(written[:len(file_batches)])
+
+    async def run_flush(self) -> None:
+        while True:
+            await asleep(Telegram.PLAYS_FLUSH_INTERVAL)
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending": sum(self._pending.values()) + sum(self._retry_files.values()),
+            "flushed": self.flushed,
+            "hot_titles": len(self._hotness),
+        }
+
+
+plays = PlayCounter(db)
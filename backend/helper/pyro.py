@@ -1,10 +1,10 @@
-import pycountry
 from pyrogram.file_id import FileId
 from typing import Optional
 from Backend.logger import LOGGER
 from Backend import __version__, now, timezone
 from Backend.config import Telegram
 from Backend.helper.exceptions import FIleNotFound
+from backend.helper.filenames import clean_filename, remove_urls
 from asyncio import create_subprocess_exec, create_subprocess_shell
 from aiofiles import open as aiopen
 from aiofiles.os import path as aiopath, remove as aioremove
@@ -19,6 +19,25 @@ from pyrogram import enums
 def is_media(message):
     return next((getattr(message, attr) for attr in ["document", "photo", "video", "audio", "voice", "video_note", "sticker", "animation"] if getattr(message, attr)), None)
 
+def read_file(message) -> Optional[dict]:
+    """Catalog fields of a channel post, None when it does not carry a video."""
+    file = message.video or message.document
+    if file is None or not (message.video or (file.mime_type or "").startswith("video/")):
+        return None
+    title = message.caption.replace("\n", "\\n") if message.caption else (file.file_name or file.file_id)
+    name = remove_urls(title)
+    if not name.endswith(('.mkv', '.mp4')):
+        name += '.mkv'
+    return {
+        "filename": clean_filename(title),
+        "name": name,
+        "unique_id": file.file_unique_id,
+        "hash": file.file_unique_id[:6],
+        "channel": int(str(message.chat.id).replace("-100", "")),
+        "msg_id": message.id,
+        "size": get_readable_file_size(file.file_size),
+    }
+
 async def get_file_ids(client: Client, chat_id: int, message_id: int) -> Optional[FileId]:
     message = await client.get_messages(chat_id, message_id)
     if message.empty:
@@ -45,15 +64,6 @@ def get_readable_file_size(size_in_bytes):
     return f'{size_in_bytes:.2f}{SIZE_UNITS[index]}' if index > 0 else f'{size_in_bytes:.2f}B'
 
 
-def clean_filename(filename):
-    pattern = r'_@[A-Za-z]+_|@[A-Za-z]+_|[\[\]\s@]*@[^.\s\[\]]+[\]\[\s@]*'
-    cleaned_filename = re.sub(pattern, '', filename)
-    cleaned_filename = re.sub(r'(?<=\W)(org|AMZN|DDP|DD|NF|AAC|TVDL|5\.1|2\.1|2\.0|7\.0|7\.1|5\.0|~|\b\w+kbps\b)(?=\W)', '', cleaned_filename, flags=re.IGNORECASE)
-    cleaned_filename = re.sub(r'\s+', ' ', cleaned_filename).strip().replace(' .', '.')
-    return cleaned_filename
-
-
-
 def get_readable_time(seconds: int) -> str:
     count = 0
     readable_time = ""
@@ -92,36 +102,6 @@ def extract_tmdb_id(url):
 
     return None
 
-def remove_urls(text):
-    url_pattern = r'\b(?:https?|ftp):\/\/[^\s/$.?#].[^\s]*'
-    text_without_urls = re.sub(url_pattern, '', text)
-    cleaned_text = re.sub(r'\s+', ' ', text_without_urls).strip()
-    return cleaned_text
-
-
-
-def normalize_languages(language):
-    """
-    Normalize the language input(s) to a list of ISO 639-1 codes using pycountry.
-    """
-    if not language:
-        return []
-
-    if isinstance(language, str):
-        language = [language]
-
-    normalized_languages = []
-    for lang in language:
-        try:
-            lang_code = pycountry.languages.get(name=lang).alpha_2
-            if lang_code:
-                normalized_languages.append(lang_code)
-        except AttributeError:
-            print(f"Language '{lang}' not found or does not have an ISO 639-1 code.")
-
-    return normalized_languages
-
-
 async def cmd_exec(cmd, shell=False):
     if shell:
         proc = await create_subprocess_shell(cmd, stdout=PIPE, stderr=PIPE)
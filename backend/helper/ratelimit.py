@@ -0,0 +1,42 @@
+import asyncio
+from time import monotonic
+
+from backend.config import Telegram
+
+
+class TokenBucket:
+    """
+    Async token bucket: up to `burst` calls go out at once, after that calls
+    are spaced to `rate` per second. Waiters are served in arrival order, so
+    a burst of files is smoothed instead of sleeping a fixed time each.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.waited = 0.0
+        self._tokens = float(burst)
+        self._updated = monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                delay = (1 - self._tokens) / self.rate
+                self.waited += delay
+                await asyncio.sleep(delay)
+                self._refill()
+            self._tokens -= 1
+
+    def stats(self) -> dict:
+        return {"rate": self.rate, "burst": self.burst, "waited_s": round(self.waited, 2)}
+
+
+imdb_limiter = TokenBucket(Telegram.IMDB_RATE_LIMIT, Telegram.IMDB_RATE_BURST)
+tmdb_limiter = TokenBucket(Telegram.TMDB_RATE_LIMIT, Telegram.TMDB_RATE_BURST)
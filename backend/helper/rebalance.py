@@ -0,0 +1,96 @@
+"""
+Move catalog documents to the shard their tmdb_id hashes to. Run this after
+adding a cluster URI to DATABASE; only titles that now belong to the new
+cluster are moved.
+
+Usage: python -m backend.helper.rebalance [--dry-run]
+"""
+import argparse
+import asyncio
+
+from backend import db
+from backend.helper.database import FILE_KEY, shard_for
+from backend.logger import LOGGER
+
+
+# Natural key of each sharded collection, used to avoid clobbering rows that
+# were already written to the right shard after the cluster was added.
+COLLECTION_KEYS = {
+    "tv": ("_id",),
+    "movie": ("_id",),
+    "files": FILE_KEY,
+    "similar": ("media_type", "tmdb_id"),
+    "tombstones": ("_id",),
+}
+
+
+async def _copy(source, target, name: str, query: dict) -> None:
+    async for doc in source.db[name].find(query):
+        key = {field: doc.get(field) for field in COLLECTION_KEYS[name]}
+        if not await target.db[name].find_one(key, {"_id": 1}):
+            await target.db[name].insert_one(doc)
+
+
+async def rebalance_titles(source, media_type: str, dry_run: bool) -> int:
+    """
+    Move each title together with its file rows and similar entry. The rows
+    are copied before the title and deleted after it, so a reader finds the
+    title and its files on the same shard at every step.
+    """
+    moved = 0
+    async for doc in source.db[media_type].find({}, {"tmdb_id": 1}):
+        target = shard_for(doc["tmdb_id"], db.shards)
+        if target is source:
+            continue
+        moved += 1
+        if dry_run:
+            continue
+
+        related = {"tmdb_id": doc["tmdb_id"], "media_type": media_type}
+        await _copy(source, target, "files", related)
+        await _copy(source, target, "similar", related)
+        await _copy(source, target, media_type, {"_id": doc["_id"]})
+        await source.db[media_type].delete_one({"_id": doc["_id"]})
+        await source.db["files"].delete_many(related)
+        await source.db["similar"].delete_many(related)
+    return moved
+
+
+async def rebalance_collection(source, name: str, dry_run: bool) -> int:
+    """Move the rows that did not go with a title, e.g. tombstones of deleted ones."""
+    moved = 0
+    async for doc in source.db[name].find({}, {"tmdb_id": 1}):
+        target = shard_for(doc["tmdb_id"], db.shards)
+        if target is source:
+            continue
+        moved += 1
+        if dry_run:
+            continue
+
+        await _copy(source, target, name, {"_id": doc["_id"]})
+        await source.db[name].delete_one({"_id": doc["_id"]})
+    return moved
+
+
+async def main(dry_run: bool = False):
+    await db.connect()
+    try:
+        if len(db.shards) < 2:
+            LOGGER.info("Only one cluster configured, nothing to rebalance")
+            return
+        verb = "Would move" if dry_run else "Moved"
+        for source in db.shards:
+            for media_type in ("tv", "movie"):
+                moved = await rebalance_titles(source, media_type, dry_run)
+                LOGGER.info(f"{verb} {moved} {media_type} titles off {source.name}")
+            for name in ("files", "similar", "tombstones"):
+                moved = await rebalance_collection(source, name, dry_run)
+                LOGGER.info(f"{verb} {moved} leftover {name} documents off {source.name}")
+    finally:
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move catalog documents to their hashed shard.")
+    parser.add_argument("--dry-run", action="store_true", help="only count the documents that would move")
+    asyncio.run(main(parser.parse_args().dry_run))
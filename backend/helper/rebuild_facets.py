@@ -0,0 +1,24 @@
+"""
+Recompute the `qualities` field of every title and the facet counts used by
+/api/filter. Counts are kept up to date on every write afterwards, so this
+only needs to run once after upgrading, or to repair drift.
+
+Usage: python -m backend.helper.rebuild_facets
+"""
+import asyncio
+
+from backend import db
+from backend.logger import LOGGER
+
+
+async def main():
+    await db.connect()
+    try:
+        await db.rebuild_facets()
+        LOGGER.info(f"Rebuilt {await db.facets.count_documents({})} facet counts")
+    finally:
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
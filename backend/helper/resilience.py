@@ -0,0 +1,160 @@
+import asyncio
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from backend.config import Telegram
+from backend.logger import LOGGER
+
+
+class CircuitBreaker:
+    """
+    Stops calling a provider after `threshold` consecutive failures. After
+    `reset_after` seconds one trial call is let through (half-open): success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name: str, threshold: int, reset_after: float):
+        self.name = name
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if monotonic() - self.opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def success(self) -> None:
+        if self.opened_at is not None:
+            LOGGER.info(f"{self.name} circuit closed")
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        self._trial = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            if self.state != "open":
+                LOGGER.warning(f"{self.name} circuit opened after {self.failures} failures")
+            self.opened_at = monotonic()
+
+    def release(self) -> None:
+        """A trial call was abandoned without an outcome."""
+        self._trial = False
+
+    def stats(self) -> dict:
+        return {"state": self.state, "failures": self.failures}
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls by key: the first caller starts the work and
+    later callers for the same key wait on the same task instead of repeating
+    it. Nothing is remembered once the task finishes.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._inflight: Dict[str, "asyncio.Task"] = {}
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shielded so a caller that gives up (a lost hedge race) does not
+        # cancel the work for everyone else waiting on it.
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {"inflight": len(self._inflight), "coalesced": self.coalesced}
+
+
+Provider = Tuple[CircuitBreaker, Callable[[], Awaitable[Any]]]
+
+
+async def _guarded(breaker: CircuitBreaker, factory: Callable[[], Awaitable[Any]]) -> Any:
+    """Run one provider lookup, feeding its outcome to the breaker. Errors become None."""
+    try:
+        result = await factory()
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        breaker.failure()
+        LOGGER.warning(f"{breaker.name} lookup failed: {e}")
+        return None
+    breaker.success()
+    return result
+
+
+async def hedged(label: str, primary: Provider, secondary: Provider, budget: float) -> Any:
+    """
+    Resolve through the primary provider, falling back to the secondary when
+    the primary fails, finds nothing or has its circuit open. If the primary
+    has not answered within `budget` seconds, the secondary is started as
+    well and the first complete (non-None) result wins. A primary that loses
+    that race counts as a failure for its breaker, so a provider that only
+    times out still trips it.
+    """
+    (p_breaker, p_factory), (s_breaker, s_factory) = primary, secondary
+
+    if not p_breaker.allow():
+        if not s_breaker.allow():
+            LOGGER.warning(f"{label}: {p_breaker.name} and {s_breaker.name} circuits are open")
+            return None
+        LOGGER.info(f"{label}: {p_breaker.name} circuit open, using {s_breaker.name}")
+        return await _guarded(s_breaker, s_factory)
+
+    first = asyncio.ensure_future(_guarded(p_breaker, p_factory))
+    done, _ = await asyncio.wait({first}, timeout=budget)
+    if done:
+        result = first.result()
+        if result is not None or not s_breaker.allow():
+            return result
+        LOGGER.info(f"{label}: no {p_breaker.name} result, falling back to {s_breaker.name}")
+        return await _guarded(s_breaker, s_factory)
+
+    if not s_breaker.allow():
+        return await first
+    LOGGER.info(f"{label}: {p_breaker.name} slower than {budget}s, hedging with {s_breaker.name}")
+    second = asyncio.ensure_future(_guarded(s_breaker, s_factory))
+    pending = {first, second}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if result is not None:
+                    winner = p_breaker if task is first else s_breaker
+                    LOGGER.info(f"{label}: resolved by {winner.name}")
+                    return result
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+        if first in pending:
+            p_breaker.failure()
+        if second in pending:
+            s_breaker.release()
+
+
+imdb_breaker = CircuitBreaker("IMDb", Telegram.BREAKER_FAILURE_THRESHOLD, Telegram.BREAKER_RESET_TIMEOUT)
+tmdb_breaker = CircuitBreaker("TMDB", Telegram.BREAKER_FAILURE_THRESHOLD, Telegram.BREAKER_RESET_TIMEOUT)
@@ -0,0 +1,164 @@
+import re
+import unicodedata
+from asyncio import get_running_loop, sleep as asleep
+from bisect import bisect_left, insort
+from heapq import nlargest
+from datetime import datetime
+from time import monotonic
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from backend import db
+from backend.config import Telegram
+from backend.logger import LOGGER
+
+
+SUGGESTION_FIELDS = ("tmdb_id", "title", "media_type", "release_year", "rating", "poster")
+
+# Short prefixes match a large part of the catalog; their ranked answers are
+# memoized until a title they cover changes.
+MEMO_PREFIX_LENGTH = 2
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase ASCII words separated by single spaces: "Amélie: Part II" -> "amelie part ii"."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+def index_keys(title: str) -> List[str]:
+    """The normalized title and every suffix starting at a word, so "dark knight" matches "kni"."""
+    words = normalize(title).split()
+    return list(dict.fromkeys(" ".join(words[i:]) for i in range(len(words))))
+
+
+Key = Tuple[str, str, int]  # (normalized key, media_type, tmdb_id)
+
+
+class TypeaheadIndex:
+    """
+    Sorted array of normalized title keys searched with bisect. A prefix maps
+    to one contiguous slice, so a lookup is two binary searches plus ranking
+    the titles in that slice by rating.
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self.ready = False
+        self._keys: List[Key] = []
+        self._titles: Dict[Tuple[str, int], dict] = {}
+        # updated_on of each indexed title, so a poll skips the ones it holds.
+        self._updated: Dict[Tuple[str, int], Optional[datetime]] = {}
+        self._memo: Dict[Tuple[str, int], List[dict]] = {}
+        self._watermark: Optional[datetime] = None
+        self._last_full_load = 0.0
+
+    def _put(self, doc: dict) -> None:
+        media_type = "movie" if doc.get("media_type") == "movie" else "tv"
+        self._remove(media_type, doc["tmdb_id"])
+        self._titles[(media_type, doc["tmdb_id"])] = {
+            field: doc.get(field) for field in SUGGESTION_FIELDS}
+        self._updated[(media_type, doc["tmdb_id"])] = doc.get("updated_on")
+        keys = index_keys(doc.get("title") or "")
+        for key in keys:
+            insort(self._keys, (key, media_type, doc["tmdb_id"]))
+        if doc.get("updated_on") and (self._watermark is None or doc["updated_on"] > self._watermark):
+            self._watermark = doc["updated_on"]
+        self._forget(keys)
+
+    def _remove(self, media_type: str, tmdb_id: int) -> None:
+        title = self._titles.pop((media_type, tmdb_id), None)
+        self._updated.pop((media_type, tmdb_id), None)
+        if title is None:
+            return
+        keys = index_keys(title.get("title") or "")
+        for key in keys:
+            i = bisect_left(self._keys, (key, media_type, tmdb_id))
+            if i < len(self._keys) and self._keys[i] == (key, media_type, tmdb_id):
+                del self._keys[i]
+        self._forget(keys)
+
+    def _forget(self, keys: Iterable[str]) -> None:
+        """Drop memoized answers for prefixes of the given keys."""
+        prefixes = {key[:length] for key in keys for length in range(1, MEMO_PREFIX_LENGTH + 1)}
+        for memo_key in [memo_key for memo_key in self._memo if memo_key[0] in prefixes]:
+            del self._memo[memo_key]
+
+    async def load(self) -> None:
+        started = monotonic()
+        keys: List[Key] = []
+        titles: Dict[Tuple[str, int], dict] = {}
+        updated: Dict[Tuple[str, int], Optional[datetime]] = {}
+        watermark = None
+        for media_type in ("movie", "tv"):
+            for doc in await self.database.summaries_since(media_type, None):
+                titles[(media_type, doc["tmdb_id"])] = {field: doc.get(field) for field in SUGGESTION_FIELDS}
+                updated[(media_type, doc["tmdb_id"])] = doc.get("updated_on")
+                keys.extend((key, media_type, doc["tmdb_id"]) for key in index_keys(doc.get("title") or ""))
+                if doc.get("updated_on") and (watermark is None or doc["updated_on"] > watermark):
+                    watermark = doc["updated_on"]
+        keys.sort()
+        self._keys, self._titles, self._updated, self._watermark = keys, titles, updated, watermark
+        self._memo = {}
+        self._last_full_load = monotonic()
+        self.ready = True
+        LOGGER.info(f"Typeahead index built: {len(titles)} titles, {len(keys)} keys in {monotonic() - started:.2f}s")
+
+    async def refresh(self) -> None:
+        for media_type in ("movie", "tv"):
+            for doc in await self.database.summaries_since(media_type, self._watermark):
+                # The watermark title comes back on every poll; re-putting it
+                # would drop the memoized prefixes for nothing.
+                key = (media_type, doc["tmdb_id"])
+                if key in self._titles and self._updated.get(key) == doc.get("updated_on"):
+                    continue
+                self._put(doc)
+
+    async def on_catalog_change(self, event: dict) -> None:
+        """Database listener: index local writes as they happen."""
+        if not self.ready:
+            return
+        if event["action"] == "delete":
+            self._remove(event["media_type"], event["tmdb_id"])
+        else:
+            for doc in await self.database.summaries_for(event["media_type"], [event["tmdb_id"]]):
+                self._put(doc)
+
+    async def run_refresh(self) -> None:
+        """Background task: pick up writes from other processes, like the catalog snapshot."""
+        while True:
+            await asleep(Telegram.CATALOG_REFRESH_INTERVAL)
+            try:
+                if monotonic() - self._last_full_load >= Telegram.CATALOG_FULL_RELOAD_INTERVAL:
+                    await self.load()
+                else:
+                    await self.refresh()
+            except Exception as e:
+                LOGGER.error(f"Error refreshing typeahead index: {e}")
+
+    async def start(self) -> None:
+        await self.load()
+        get_running_loop().create_task(self.run_refresh())
+
+    def suggest(self, query: str, limit: int) -> List[dict]:
+        """Best rated titles with a word starting with `query`."""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        memo_key = (prefix, limit)
+        if memo_key in self._memo:
+            return self._memo[memo_key]
+
+        start = bisect_left(self._keys, (prefix,))
+        end = bisect_left(self._keys, (prefix + "\uffff",), lo=start)
+        matches = {(media_type, tmdb_id) for _, media_type, tmdb_id in self._keys[start:end]}
+        ranked = nlargest(
+            limit, (self._titles[match] for match in matches), key=lambda title: title.get("rating") or 0)
+        if len(prefix) <= MEMO_PREFIX_LENGTH:
+            self._memo[memo_key] = ranked
+        return ranked
+
+
+typeahead = TypeaheadIndex(db)
@@ -1,13 +1,16 @@
 from asyncio import create_task, sleep as asleep
 from urllib.parse import urlparse
 from Backend.logger import LOGGER
-from Backend import db
+from backend import db
 from Backend.config import Telegram
 from Backend.helper.custom_filter import CustomFilters
 from Backend.helper.encrypt import decode_string
-from Backend.helper.metadata import metadata
-from Backend.helper.pyro import clean_filename, get_readable_file_size, remove_urls
-from Backend.pyrofork import StreamBot
+from backend.helper.backfill import backfill
+from backend.helper.enrichment import catalog_lock, enricher
+from backend.helper.known_files import known_files
+from backend.helper.metadata import parse_media, provisional_metadata
+from backend.helper.pyro import read_file
+from Backend.pyrofork import StreamBot, multi_clients
 from pyrogram import filters, Client
 from pyrogram.types import Message
 from os import path as ospath
@@ -216,20 +219,29 @@ async def start(bot: Client, message: Message):
 
 # Global queue for processing file updates
 
-from asyncio import Lock
+# Files are written under a placeholder from their name right away; the
+# enricher fills in the real metadata in the background.
 
 file_queue = Queue()
-db_lock = Lock()
 
 async def process_file():
     while True:
-        metadata_info, hash, channel, msg_id, size, title = await file_queue.get()
-        async with db_lock:
-            updated_id = await db.insert_media(metadata_info, hash=hash, channel=channel, msg_id=msg_id, size=size, name=title)
+        metadata_info, entry = await file_queue.get()
+        hash, channel, msg_id, size, title = entry["hash"], entry["channel"], entry["msg_id"], entry["size"], entry["name"]
+        updated_id = None
+        try:
+            async with catalog_lock:
+                updated_id = await db.insert_media(metadata_info, hash=hash, channel=channel, msg_id=msg_id, size=size, name=title)
             if updated_id:
                 LOGGER.info(f"{metadata_info['media_type']} updated with ID: {updated_id}")
+                await known_files.add(channel, msg_id, metadata_info['media_type'], metadata_info['tmdb_id'], entry["unique_id"])
+                await enricher.submit(entry["filename"], metadata_info, hash, channel, msg_id, size, title)
             else:
                 LOGGER.info("Update failed due to validation errors.")
+        except Exception as e:
+            LOGGER.error(f"Error cataloguing {title}: {e}")
+        if not updated_id:
+            known_files.release(entry["unique_id"], channel, msg_id)
         file_queue.task_done()
 
 for _ in range(1):
@@ -240,27 +252,17 @@ for _ in range(1):
 async def file_receive_handler(bot: Client, message: Message):
     if str(message.chat.id) in Telegram.AUTH_CHANNEL:
         try:
-            if message.video or message.document.mime_type.startswith("video/"):
-                file = message.video or message.document
-                if message.caption:
-                    title = message.caption.replace("\n", "\\n")
-                else:
-                    title = file.file_name or file.file_id
-
-                msg_id = message.id
-                hash = file.file_unique_id[:6]
-                size = get_readable_file_size(file.file_size)
-                channel = str(message.chat.id).replace("-100", "")
-                
-                metadata_info = await metadata(clean_filename(title), file)
-                if metadata_info is None:
-                    return await message.reply_text("> Not added check log")
-                title = remove_urls(title)
-                if not title.endswith(('.mkv', '.mp4')):
-                    title += '.mkv'
-                await file_queue.put((metadata_info, hash, int(channel), msg_id, size, title))
-            else:
-                await message.reply_text("> Not supported")
+            entry = read_file(message)
+            if entry is None:
+                return await message.reply_text("> Not supported")
+            # Re-posts and re-forwards stop here, before any parsing or lookups.
+            if not known_files.claim(entry["unique_id"], entry["channel"], entry["msg_id"]):
+                return LOGGER.info(f"Skipping {entry['name']}: already catalogued")
+            parsed = parse_media(entry["filename"])
+            if parsed is None:
+                known_files.release(entry["unique_id"], entry["channel"], entry["msg_id"])
+                return await message.reply_text("> Not added check log")
+            await file_queue.put((provisional_metadata(parsed), entry))
         except FloodWait as e:
             LOGGER.info(f"Sleeping for {str(e.value)}s")
             await asleep(e.value)
@@ -307,6 +309,38 @@ async def set_id(bot: Client, message: Message):
 
 
 
+@Client.on_message(filters.command('enrich') & filters.private & CustomFilters.owner)
+async def retry_enrichment(bot: Client, message: Message):
+    try:
+        count = await enricher.retry_dead()
+        stats = enricher.stats()
+        await message.reply_text(
+            f"Requeued {count} files without metadata\n"
+            f"Queued: {stats['queued']} | Enriched: {stats['enriched']} | Retried: {stats['retried']}")
+    except Exception as e:
+        await message.reply_text(f"An error occurred: {e}")
+
+@Client.on_message(filters.command('backfill') & filters.private & CustomFilters.owner)
+async def backfill_channels(bot: Client, message: Message):
+    if backfill.running:
+        return await message.reply_text("A backfill is already running")
+    args = message.text.split()[1:]
+    reset = "reset" in args
+    channels = [arg for arg in args if arg.lstrip("-").isdigit()] or Telegram.AUTH_CHANNEL
+    status = await message.reply_text(f"Backfilling {len(channels)} channels with {len(multi_clients)} clients...")
+
+    async def report(text):
+        await status.edit_text(text)
+
+    async def run():
+        try:
+            await backfill.run(list(multi_clients.values()), channels, reset=reset, report=report)
+        except Exception as e:
+            LOGGER.error(f"Backfill failed: {e}")
+            await message.reply_text(f"Backfill failed: {e}")
+
+    create_task(run())
+
 @Client.on_message(filters.command('delete') & filters.private & CustomFilters.owner)
 async def delete(bot: Client, message: Message):
     try:
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Benchmark the CPU cost of rendering one /api/tvshows page.
+
+Separates the two changes to that path:
+
+- projection: full documents (validated into TVShowSchema) versus summary
+  documents (validated into the MediaSummary model listings used before
+  they were served through orjson), both through jsonable_encoder +
+  json.dumps as FastAPI does by default;
+- serializer: the same full and summary documents dumped with orjson as-is;
+
+plus the cached bytes reused on a hit. Only the per-request serialization
+work is measured, single threaded, so the numbers are requests/sec per core
+for that part of the handler.
+
+Usage: python benchmarks/api_serialization.py [--page-size 20] [--seasons 8]
+"""
+import argparse
+import importlib.util
+import json
+import os
+from datetime import datetime
+from timeit import repeat
+
+from typing import List, Optional
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, Field
+
+# Load the schema module on its own; importing the backend package would
+# connect the bot and database clients.
+_spec = importlib.util.spec_from_file_location(
+    "modal", os.path.join(os.path.dirname(__file__), "..", "backend", "helper", "modal.py"))
+_modal = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_modal)
+TVShowSchema = _modal.TVShowSchema
+
+
+class MediaSummary(BaseModel):
+    """The listing model removed from backend/helper/modal.py, kept here for comparison."""
+    tmdb_id: int = Field(..., description="The TMDB ID of the title")
+    title: str = Field(..., description="Title of the Movie or TV show")
+    genres: List[str] = Field(..., description="List of genres associated with the title")
+    description: str = Field("", description="Brief description of the title")
+    rating: float = Field(..., description="Average rating of the title")
+    release_year: int = Field(..., description="Release year of the title")
+    poster: str = Field(..., description="URL to the poster image")
+    backdrop: str = Field("", description="URL to the backdrop image")
+    media_type: str = Field(..., description="Media Type of the file")
+    updated_on: Optional[datetime] = Field(None, description="Timestamp of the last update")
+    languages: List[str] = Field(default_factory=list, description="List of languages associated with the title")
+    rip: str = Field("", description="Media rip of the file")
+    runtime: Optional[int] = Field(None, description="runtime of the movie")
+    total_seasons: Optional[int] = Field(None, description="Total Season of tv show")
+    total_episodes: Optional[int] = Field(None, description="Total Episode of tv show")
+
+
+SUMMARY_FIELDS = (
+    "tmdb_id", "title", "genres", "description", "rating", "release_year",
+    "poster", "backdrop", "media_type", "updated_on", "languages", "rip",
+    "total_seasons", "total_episodes"
+)
+
+
+def make_show(tmdb_id: int, seasons: int, episodes: int) -> dict:
+    return {
+        "tmdb_id": tmdb_id,
+        "title": f"Show {tmdb_id}",
+        "genres": ["Drama", "Crime", "Mystery"],
+        "description": "A long running show. " * 12,
+        "rating": 8.1,
+        "release_year": 2010,
+        "poster": f"https://image.tmdb.org/t/p/w500/poster{tmdb_id}.jpg",
+        "backdrop": f"https://image.tmdb.org/t/p/original/backdrop{tmdb_id}.jpg",
+        "total_seasons": seasons,
+        "total_episodes": seasons * episodes,
+        "media_type": "tv",
+        "status": "Ended",
+        "updated_on": datetime(2024, 5, 1, 12, 30),
+        "languages": ["en", "hi"],
+        "rip": "WEB-DL",
+        "seasons": [
+            {
+                "season_number": s,
+                "episodes": [
+                    {
+                        "episode_number": e,
+                        "title": f"Episode {e}",
+                        "episode_backdrop": f"https://image.tmdb.org/t/p/original/s{s}e{e}.jpg",
+                        "telegram": [
+                            {"quality": q, "id": "x" * 40, "name": f"Show.S{s:02}E{e:02}.{q}.mkv", "size": "1.20GB"}
+                            for q in ("480p", "720p", "1080p")
+                        ],
+                    }
+                    for e in range(1, episodes + 1)
+                ],
+            }
+            for s in range(1, seasons + 1)
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--seasons", type=int, default=8)
+    parser.add_argument("--episodes", type=int, default=20)
+    parser.add_argument("--number", type=int, default=50)
+    args = parser.parse_args()
+
+    shows = [make_show(i, args.seasons, args.episodes) for i in range(args.page_size)]
+    summaries = [{k: show[k] for k in SUMMARY_FIELDS} for show in shows]
+    cached_body = orjson.dumps({"total_count": 1000, "tv_shows": summaries}, default=str)
+
+    def full_pydantic():
+        page = {"total_count": 1000, "tv_shows": [TVShowSchema(**doc) for doc in shows]}
+        return json.dumps(jsonable_encoder(page)).encode()
+
+    def summary_pydantic():
+        page = {"total_count": 1000, "tv_shows": [MediaSummary(**doc) for doc in summaries]}
+        return json.dumps(jsonable_encoder(page)).encode()
+
+    def full_orjson():
+        return orjson.dumps({"total_count": 1000, "tv_shows": shows}, default=str)
+
+    def summary_orjson():
+        return orjson.dumps({"total_count": 1000, "tv_shows": summaries}, default=str)
+
+    def cache_hit():
+        return bytes(cached_body)
+
+    print(f"page of {args.page_size} shows, {args.seasons} seasons x {args.episodes} episodes x 3 qualities")
+    print(f"{'documents':<11}{'serializer':<26}{'bytes':>12}{'req/s/core':>14}")
+    for documents, serializer, fn in (
+        ("full", "pydantic + json", full_pydantic),
+        ("summaries", "pydantic + json", summary_pydantic),
+        ("full", "orjson", full_orjson),
+        ("summaries", "orjson (cache miss)", summary_orjson),
+        ("summaries", "cached bytes (cache hit)", cache_hit),
+    ):
+        best = min(repeat(fn, number=args.number, repeat=5)) / args.number
+        print(f"{documents:<11}{serializer:<26}{len(fn()):>12}{1 / best:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Benchmark and accuracy check for filename classification.
+
+Runs every name in filename_corpus.jsonl through the ingestion parse path
+(clean_filename -> PTN -> normalize_languages) and reports:
+
+- accuracy per field against the labels in the corpus;
+- whether the memoized parse agrees with an unmemoized parse of the same name;
+- files/sec for the previous implementation (patterns compiled per call,
+  pycountry lookup per language token) and the current one with the memo
+  cleared before every file, cleared once per pass over the corpus (names
+  sharing a season pack or release group hit it) and warm (a re-forwarded
+  season pack).
+
+Add names to the corpus as channels turn up new naming schemes; a label is
+the correct answer, not what the parser currently returns.
+
+Usage: python benchmarks/filename_parsing.py [--number 20] [--verbose] [--min-accuracy 0.9]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import re
+import sys
+import types
+from time import perf_counter
+from timeit import repeat
+
+import PTN
+import pycountry
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS = os.path.join(HERE, "filename_corpus.jsonl")
+FIELDS = ("title", "year", "season", "episode", "resolution", "languages")
+
+# Load the module without running backend/__init__.py, which would connect
+# the bot and database clients.
+_package = types.ModuleType("backend")
+_package.__path__ = [os.path.join(HERE, "..", "backend")]
+sys.modules.setdefault("backend", _package)
+_spec = importlib.util.spec_from_file_location(
+    "filenames", os.path.join(HERE, "..", "backend", "helper", "filenames.py"))
+filenames = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(filenames)
+
+
+def legacy_clean_filename(filename):
+    pattern = r'_@[A-Za-z]+_|@[A-Za-z]+_|[\[\]\s@]*@[^.\s\[\]]+[\]\[\s@]*'
+    cleaned_filename = re.sub(pattern, '', filename)
+    cleaned_filename = re.sub(r'(?<=\W)(org|AMZN|DDP|DD|NF|AAC|TVDL|5\.1|2\.1|2\.0|7\.0|7\.1|5\.0|~|\b\w+kbps\b)(?=\W)', '', cleaned_filename, flags=re.IGNORECASE)
+    return re.sub(r'\s+', ' ', cleaned_filename).strip().replace(' .', '.')
+
+
+def legacy_normalize_languages(language):
+    if not language:
+        return []
+    if isinstance(language, str):
+        language = [language]
+    normalized = []
+    for lang in language:
+        try:
+            normalized.append(pycountry.languages.get(name=lang).alpha_2)
+        except AttributeError:
+            pass  # the old code printed here; the print is not timed
+    return normalized
+
+
+def legacy(name):
+    parsed = PTN.parse(legacy_clean_filename(name))
+    parsed["languages"] = legacy_normalize_languages(parsed.get("language"))
+    return parsed
+
+
+def current(name):
+    parsed = filenames.parse(filenames.clean_filename(name))
+    parsed["languages"] = filenames.normalize_languages(parsed.get("language"))
+    return parsed
+
+
+def cold(name):
+    filenames.clear_cache()
+    return current(name)
+
+
+def per_pass(names):
+    # A fresh process working through a backlog: nothing memoized up front,
+    # but names share heads (season packs) and tags (release groups).
+    filenames.clear_cache()
+    return [current(name) for name in names]
+
+
+def load_corpus():
+    with open(CORPUS, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def check_accuracy(corpus, verbose):
+    correct = dict.fromkeys(FIELDS, 0)
+    exact = agree = 0
+    for row in corpus:
+        parsed = current(row["name"])
+        misses = [field for field in FIELDS if parsed.get(field) != row[field]]
+        for field in FIELDS:
+            correct[field] += field not in misses
+        exact += not misses
+        direct = filenames._parse_uncached(filenames.clean_filename(row["name"]))
+        agree += {k: v for k, v in parsed.items() if k != "languages"} == direct
+        if verbose and misses:
+            print(f"  {row['name']}")
+            for field in misses:
+                print(f"    {field}: expected {row[field]!r}, got {parsed.get(field)!r}")
+
+    total = len(corpus)
+    print(f"{'field':<14}{'accuracy':>10}")
+    for field in FIELDS:
+        print(f"{field:<14}{correct[field] / total:>10.1%}")
+    print(f"{'all fields':<14}{exact / total:>10.1%}")
+    print(f"memoized parse agrees with an unmemoized parse on {agree}/{total} names\n")
+    return exact / total, agree == total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--number", type=int, default=20, help="passes over the corpus per timing")
+    parser.add_argument("--verbose", action="store_true", help="list every mislabelled field")
+    parser.add_argument("--min-accuracy", type=float, default=0.0,
+                        help="exit non-zero when fewer names than this are fully correct")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    names = [row["name"] for row in corpus]
+
+    started = perf_counter()
+    filenames.language_table()
+    print(f"{len(corpus)} names; language table built in {(perf_counter() - started) * 1000:.0f} ms\n")
+
+    accuracy, consistent = check_accuracy(corpus, args.verbose)
+
+    print(f"{'path':<34}{'files/s':>12}")
+    for label, run in (
+        ("previous (uncompiled, pycountry)", lambda: [legacy(name) for name in names]),
+        ("current, memo cleared per file", lambda: [cold(name) for name in names]),
+        ("current, memo cleared per pass", lambda: per_pass(names)),
+        ("current, warm memo", lambda: [current(name) for name in names]),
+    ):
+        best = min(repeat(run, number=args.number, repeat=3))
+        print(f"{label:<34}{len(names) * args.number / best:>12,.0f}")
+    info = filenames.cache_info()
+    print(f"\nparse memo: {info['tag_entries']} release tags and {info['whole_entries']} whole names "
+          f"for {len(names)} names")
+
+    if accuracy < args.min_accuracy or not consistent:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()